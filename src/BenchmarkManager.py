@@ -12,7 +12,6 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-import glob
 import itertools
 import importlib
 import json
@@ -20,17 +19,22 @@ import logging
 import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from typing import NamedTuple
 import inquirer
 import matplotlib.pyplot as plt
 import matplotlib
 from collections import defaultdict
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import yaml
 import subprocess
 
+from MappingCache import MappingCache
+
 matplotlib.rc('font', **{'family': 'serif', 'serif': ['Computer Modern']})
 matplotlib.rc('font', family='serif')
 matplotlib.rcParams['savefig.dpi'] = 300
@@ -134,6 +138,155 @@ def _check_git_status(git_dir: str) -> (str, any):
     return git_revision_number, git_uncommitted_changes
 
 
+class BenchmarkUnit(NamedTuple):
+    """
+    A single run of the experimental plan. The unit only holds indices into the loaded benchmark config, so that it can
+    be executed by every process which loaded the same config.
+    """
+    application_config_idx: int
+    mapping_name: str
+    mapping_config_idx: int
+    solver_name: str
+    solver_config_idx: int
+    device_idx: int
+    repetition: int
+    # Whether this unit saves the problem instance, so that every instance is only written by a single process
+    save_problem: bool
+
+
+# Fields of a result record identifying the benchmark unit it belongs to
+_RESULT_KEY_FIELDS = ["application_config", "mapping", "mapping_config", "solver", "solver_config", "device",
+                      "device_config", "repetition"]
+
+
+def _get_result_key(result: dict) -> str:
+    """
+    Returns the key of the benchmark unit a result record (or journal entry) belongs to.
+
+    :param result: result record or journal entry
+    :type result: dict
+    :return: the key of the benchmark unit
+    :rtype: str
+    """
+    return json.dumps({field: result[field] for field in _RESULT_KEY_FIELDS}, sort_keys=True)
+
+
+def _read_jsonl(filename: str) -> list:
+    """
+    Reads the records of a .jsonl file which is appended to during a benchmark run. If the run was killed while a
+    record was written, the incomplete last line is cut off the file, so that the next record appended to it starts
+    on a new line. Lines which can not be parsed are skipped.
+
+    :param filename: path of the .jsonl file
+    :type filename: str
+    :return: the records of the file
+    :rtype: list
+    """
+    with open(filename, 'rb+') as fp:
+        content = fp.read()
+        end = content.rfind(b"\n") + 1
+        if end < len(content):
+            logging.warning(f"Removing incomplete last line of {filename}")
+            fp.truncate(end)
+
+    records = []
+    for line in content[:end].decode(errors="replace").split("\n"):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        if isinstance(record, dict):
+            records.append(record)
+        else:
+            logging.warning(f"Skipping invalid line in {filename}: {line[:100]}")
+    return records
+
+
+# Columns of the results holding dicts, which are stored as json
+_CONFIG_COLUMNS = ["application_config", "solver_config", "mapping_config", "device_config"]
+_JSON_COLUMNS = _CONFIG_COLUMNS + ["additional_solver_information"]
+# Prefixes of the typed columns the configs are flattened into in results.parquet
+_FLATTENED_PREFIXES = tuple(f"{column}." for column in _CONFIG_COLUMNS)
+# Columns needed by visualize_results
+_VISUALIZATION_COLUMNS = ["application", "application_config", "mapping", "mapping_config", "solver",
+                          "solver_config", "device", "device_config", "solution_validity", "solution_quality",
+                          "solution_quality_unit", "time_to_solve", "time_to_solve_unit"]
+
+
+def _flatten_config(configs: pd.Series, prefix: str) -> pd.DataFrame:
+    """
+    Flattens a column of config dicts into one column per config key, named '<prefix>.<key>'.
+
+    :param configs: the config dicts
+    :type configs: pd.Series
+    :param prefix: prefix of the column names
+    :type prefix: str
+    :return: dataframe with one column per config key
+    :rtype: pd.DataFrame
+    """
+    flattened = pd.json_normalize(configs.tolist())
+    flattened.columns = [f"{prefix}.{key}" for key in flattened.columns]
+    flattened.index = configs.index
+    return flattened
+
+
+# BenchmarkManager of a worker process (see _init_worker)
+_worker_benchmark_manager = None
+
+
+def _init_worker(config: dict, app_modules: list, store_dir: str, git_revision_number: str,
+                 git_uncommitted_changes: any, mapping_cache_dir: str) -> None:
+    """
+    Initializes a worker process of a parallel benchmark run by loading the benchmark config into its own
+    BenchmarkManager. Every worker therefore has its own instances of the application, mappings, solvers and devices.
+
+    :param config: valid config file
+    :type config: dict
+    :param app_modules: the list of application modules as specified in the application modules configuration.
+    :type app_modules: list of dict
+    :param store_dir: directory of the benchmark run
+    :type store_dir: str
+    :param git_revision_number: git revision number of the QUARK framework
+    :type git_revision_number: str
+    :param git_uncommitted_changes: whether there are uncommitted changes
+    :type git_uncommitted_changes: any
+    :param mapping_cache_dir: directory of the on-disk tier of the mapping cache
+    :type mapping_cache_dir: str
+    :rtype: None
+    """
+    global _worker_benchmark_manager
+    if not logging.getLogger().handlers:
+        # Worker processes which are not forked from the main process do not inherit its logging configuration
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(message)s",
+            handlers=[
+                logging.FileHandler(f"{store_dir}/logger.log"),
+                logging.StreamHandler()
+            ]
+        )
+    _worker_benchmark_manager = BenchmarkManager()
+    _worker_benchmark_manager.store_dir = store_dir
+    _worker_benchmark_manager.git_revision_number = git_revision_number
+    _worker_benchmark_manager.git_uncommitted_changes = git_uncommitted_changes
+    _worker_benchmark_manager.mapping_cache = MappingCache(cache_dir=mapping_cache_dir)
+    _worker_benchmark_manager.load_config(config, app_modules)
+
+
+def _run_benchmark_unit(unit: BenchmarkUnit) -> dict:
+    """
+    Runs a benchmark unit in a worker process.
+
+    :param unit: the benchmark unit to run
+    :type unit: BenchmarkUnit
+    :return: the result record of this run or None if an error occurred
+    :rtype: dict
+    """
+    return _worker_benchmark_manager.run_benchmark_unit(unit)
+
+
 class BenchmarkManager:
     """
     The benchmark manager is the main component of QUARK orchestrating the overall benchmarking process.
@@ -154,6 +307,9 @@ class BenchmarkManager:
         self.mapping_solver_device_combinations = {}
         self.repetitions = 1
         self.store_dir = None
+        self.git_revision_number = "unknown"
+        self.git_uncommitted_changes = "unknown"
+        self.mapping_cache = MappingCache()
 
     def generate_benchmark_configs(self, app_modules: list) -> dict:
         """
@@ -413,165 +569,417 @@ class BenchmarkManager:
         self.store_dir = f"{store_dir}/benchmark_runs/{tag + '-' if not None else ''}{datetime.today().strftime('%Y-%m-%d-%H-%M-%S')}"
         Path(self.store_dir).mkdir(parents=True, exist_ok=True)
 
-    def orchestrate_benchmark(self, config: dict, app_modules: list, store_dir: str = None) -> None:
+    def orchestrate_benchmark(self, config: dict, app_modules: list, store_dir: str = None, workers: int = 1,
+                              resume_dir: str = None, mapping_cache_dir: str = None) -> None:
         """
         Executes the benchmarks according to the given settings.
 
+        If resume_dir is given, the benchmark run stored in this directory is continued: all benchmark units listed in
+        its journal are skipped and only the missing ones are executed.
+
+        Mapped problems are cached, so that a problem is only mapped once per mapping config. If mapping_cache_dir is
+        given, the cache is additionally kept on disk and shared by the worker processes and later benchmark runs.
+
         :param config: valid config file
         :type config: dict
         :param app_modules: the list of application modules as specified in the application modules configuration.
         :type app_modules: list of dict
         :param store_dir: target directory to store the results of the benchmark (if you decided to store it)
         :type store_dir: str
+        :param workers: number of worker processes used to execute the benchmark units in parallel
+        :type workers: int
+        :param resume_dir: directory of an interrupted benchmark run which should be resumed
+        :type resume_dir: str
+        :param mapping_cache_dir: directory of the on-disk tier of the mapping cache
+        :type mapping_cache_dir: str
         :rtype: None
         """
         # TODO Make this nicer
 
 
         appl_name = config["application"]["name"]
-        self._create_store_dir(store_dir, tag=appl_name.lower())
+        if resume_dir is None:
+            self._create_store_dir(store_dir, tag=appl_name.lower())
+        else:
+            self.store_dir = resume_dir
 
         logger = logging.getLogger()
         formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
         fh = logging.FileHandler(f"{self.store_dir}/logger.log")
         fh.setFormatter(formatter)
         logger.addHandler(fh)
-        logging.info(f"Created Benchmark run directory {self.store_dir}")
+        if resume_dir is None:
+            logging.info(f"Created Benchmark run directory {self.store_dir}")
+        else:
+            logging.info(f"Resuming Benchmark run in directory {self.store_dir}")
 
         self.load_config(config, app_modules)
 
         # Collect git revision number and check if there are uncommitted changes to allow user to analyze which
         # codebase was used for benchmark runs
         git_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", )
-        git_revision_number, git_uncommitted_changes = _check_git_status(git_dir)
-        if git_revision_number != "unknown":
+        self.git_revision_number, self.git_uncommitted_changes = _check_git_status(git_dir)
+        if self.git_revision_number != "unknown":
             logging.info(
-                f"Codebase of the QUARK framework is based on revision {git_revision_number} and has {'some' if git_uncommitted_changes else 'no'} uncommitted changes")
-
-        with open(f"{self.store_dir}/config.yml", 'w') as fp:
-            yaml.dump(config, fp)
+                f"Codebase of the QUARK framework is based on revision {self.git_revision_number} and has {'some' if self.git_uncommitted_changes else 'no'} uncommitted changes")
+
+        self.mapping_cache = MappingCache(cache_dir=mapping_cache_dir)
+
+        if resume_dir is None:
+            with open(f"{self.store_dir}/config.yml", 'w') as fp:
+                yaml.dump(config, fp)
+
+        for idx, application_config in enumerate(self.application_configs):
+            path = f"{self.store_dir}/application_config_{idx}"
+            Path(path).mkdir(parents=True, exist_ok=True)
+            with open(f"{path}/application_config.json", 'w') as fp:
+                json.dump(application_config, fp)
+
+        units = self._get_benchmark_units()
+        # the results of every application config, ordered like the units of the experimental plan
+        results = {idx: {} for idx in range(len(self.application_configs))}
+        pending = list(range(len(units)))
+        if resume_dir is not None:
+            pending = self._load_finished_units(units, results)
+            logging.info(f"{len(units) - len(pending)} of {len(units)} benchmark units already finished")
         try:
-            for idx, application_config in enumerate(self.application_configs):
-                results = []
-
-                path = f"{self.store_dir}/application_config_{idx}"
-                Path(path).mkdir(parents=True, exist_ok=True)
-                with open(f"{path}/application_config.json", 'w') as fp:
-                    json.dump(application_config, fp)
-                for mapping_name, mapping_value in self.mapping_solver_device_combinations.items():
-                    mapping = mapping_value["mapping_instance"]
-                    for mapping_config in mapping_value['mapping_config']:
-                        for solver_name, solver_value in mapping_value["solvers"].items():
-                            solver = solver_value["solver_instance"]
-                            for solver_config in solver_value['solver_config']:
-                                for device, device_config in solver_value["devices"]:
-                                    for i in range(1, self.repetitions + 1):
-                                        problem = self.application.init_problem(application_config, idx, i, path)
-                                        mapped_problem, time_to_mapping = mapping.map(problem, mapping_config)
-                                        try:
-                                            logging.info(
-                                                f"Running {self.application.__class__.__name__} with config "
-                                                f"{application_config}"
-                                                f" on solver {solver.__class__.__name__} and device "
-                                                f"{device.get_device_name()}"
-                                                f" (Repetition {i}/{self.repetitions})")
-
-                                            if solver_config:
-                                                logging.info(f"Used solver config: {solver_config}")
-                                            if device_config:
-                                                logging.info(f"Used device config: {device_config}")
-                                            solution_raw, time_to_solve, additional_solver_information = solver.run(
-                                                mapped_problem, device, solver_config, store_dir=path, repetition=i)
-                                            processed_solution, time_to_reverse_map = mapping.reverse_map(solution_raw)
-                                            try:
-                                                processed_solution, time_to_process_solution = self.application.process_solution(
-                                                    processed_solution)
-                                                solution_validity, time_to_validation = self.application.validate(
-                                                    processed_solution)
-                                            except Exception:
-                                                logging.exception("Exception on processing the solution")
-                                                solution_validity = False
-                                                time_to_process_solution = None
-                                                time_to_validation = None
-                                            if solution_validity:
-                                                solution_quality, time_to_evaluation = self.application.evaluate(
-                                                    processed_solution)
-                                            else:
-                                                solution_quality = None
-                                                time_to_evaluation = None
-                                            results.append({
-                                                "timestamp": datetime.today().strftime('%Y-%m-%d-%H-%M-%S'),
-                                                "time_to_solution": sum(filter(None, [time_to_mapping, time_to_solve,
-                                                                                      time_to_reverse_map,
-                                                                                      time_to_process_solution,
-                                                                                      time_to_validation,
-                                                                                      time_to_evaluation])),
-                                                "time_to_solution_unit": "ms",
-                                                "time_to_process_solution": time_to_process_solution,
-                                                "time_to_process_solution_unit": "ms",
-                                                "time_to_validation": time_to_validation,
-                                                "time_to_validation_unit": "ms",
-                                                "time_to_evaluation": time_to_evaluation,
-                                                "time_to_evaluation_unit": "ms",
-                                                "solution_validity": solution_validity,
-                                                "solution_quality": solution_quality,
-                                                "solution_quality_unit": self.application.get_solution_quality_unit(),
-                                                "solution_raw": str(solution_raw),
-                                                "additional_solver_information": additional_solver_information,
-                                                # TODO Revise this (I am only doing this for now since json.dumps does not like tuples as keys for dicts
-                                                "time_to_solve": time_to_solve,
-                                                "time_to_solve_unit": "ms",
-                                                "repetition": i,
-                                                "application": self.application.__class__.__name__,
-                                                "application_config": application_config,
-                                                "mapping_config": mapping_config,
-                                                "time_to_reverse_map": time_to_reverse_map,
-                                                "time_to_reverse_map_unit": "ms",
-                                                "time_to_mapping": time_to_mapping,
-                                                "time_to_mapping_unit": "ms",
-                                                "solver_config": solver_config,
-                                                "mapping": mapping.__class__.__name__,
-                                                "solver": solver.__class__.__name__,
-                                                "device_class": device.__class__.__name__,
-                                                "device": device.get_device_name(),
-                                                "device_config": device_config,
-                                                "git_revision_number": git_revision_number,
-                                                "git_uncommitted_changes ": git_uncommitted_changes
-                                            })
-                                            with open(f"{path}/results.json", 'w') as fp:
-                                                json.dump(results, fp)
-                                            df = self._collect_all_results()
-                                            self._save_as_csv(df)
-                                        except Exception as e:
-                                            logging.error(f"Error during benchmark run: {e}", exc_info=True)
-                                            with open(f"{path}/error.log", 'a') as fp:
-                                                fp.write(
-                                                    f"Solver: {solver_name}, Device: {device.get_device_name()}, Error: {str(e)} "
-                                                    f"(For more information take a look at logger.log)")
-                                                fp.write("\n")
-
-                with open(f"{path}/results.json", 'w') as fp:
-                    json.dump(results, fp)
+            if workers > 1:
+                logging.info(f"Running {len(pending)} benchmark units in {workers} worker processes")
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                               initargs=(config, app_modules, self.store_dir,
+                                                         self.git_revision_number, self.git_uncommitted_changes,
+                                                         mapping_cache_dir))
+                try:
+                    futures = {executor.submit(_run_benchmark_unit, units[position]): position for position in pending}
+                    for future in as_completed(futures):
+                        position = futures[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            # e.g. an error of the mapping in the worker or a broken process pool, the results of the
+                            # other units are still collected and consolidated
+                            logging.error(f"Benchmark unit {self._get_unit_key(units[position])} failed: {e}",
+                                          exc_info=True)
+                            continue
+                        self._store_result(results, units[position], position, result)
+                finally:
+                    executor.shutdown(cancel_futures=True)
+            else:
+                for position in pending:
+                    self._store_result(results, units[position], position, self.run_benchmark_unit(units[position]))
         # catching ctrl-c and killing network if desired
         except KeyboardInterrupt:
             logger.info("CTRL-C detected. Still trying to create results.csv.")
-        df = self._collect_all_results()
+
+        # The results are only consolidated once at the end of the benchmark run
+        for idx in range(len(self.application_configs)):
+            with open(f"{self.store_dir}/application_config_{idx}/results.json", 'w') as fp:
+                json.dump([results[idx][position] for position in sorted(results[idx])], fp)
+        df = self._collect_all_results(results)
+        self._save_as_parquet(df)
         self._save_as_csv(df)
 
-    def _collect_all_results(self) -> pd.DataFrame:
+    def _get_benchmark_units(self) -> list:
         """
-        Collect all results from the multiple results.json.
+        Flattens the experimental plan (application config x mapping config x solver config x device x repetition)
+        into a list of independent benchmark units.
 
+        :return: list of benchmark units in the order of the experimental plan
+        :rtype: list of BenchmarkUnit
+        """
+        units = []
+        # the problem instance of each (application config, problem) is only saved by the first unit using it
+        saved_problems = set()
+        for idx, application_config in enumerate(self.application_configs):
+            regenerate = self.application.regenerate_on_iteration(application_config)
+            for mapping_name, mapping_value in self.mapping_solver_device_combinations.items():
+                for mapping_config_idx in range(len(mapping_value['mapping_config'])):
+                    for solver_name, solver_value in mapping_value["solvers"].items():
+                        for solver_config_idx in range(len(solver_value['solver_config'])):
+                            for device_idx in range(len(solver_value["devices"])):
+                                for i in range(1, self.repetitions + 1):
+                                    problem_key = (idx, i if regenerate else None)
+                                    units.append(BenchmarkUnit(idx, mapping_name, mapping_config_idx, solver_name,
+                                                               solver_config_idx, device_idx, i,
+                                                               problem_key not in saved_problems))
+                                    saved_problems.add(problem_key)
+        return units
+
+    def _get_unit_key(self, unit: BenchmarkUnit) -> str:
+        """
+        Returns the key identifying a benchmark unit in the journal. It is built from the same fields as
+        _get_result_key, so that the unit of a result record can be found as well.
+
+        :param unit: the benchmark unit
+        :type unit: BenchmarkUnit
+        :return: the key of the unit
+        :rtype: str
+        """
+        mapping_value = self.mapping_solver_device_combinations[unit.mapping_name]
+        solver_value = mapping_value["solvers"][unit.solver_name]
+        device, device_config = solver_value["devices"][unit.device_idx]
+        return _get_result_key({
+            "application_config": self.application_configs[unit.application_config_idx],
+            "mapping": mapping_value["mapping_instance"].__class__.__name__,
+            "mapping_config": mapping_value['mapping_config'][unit.mapping_config_idx],
+            "solver": solver_value["solver_instance"].__class__.__name__,
+            "solver_config": solver_value['solver_config'][unit.solver_config_idx],
+            "device": device.get_device_name(),
+            "device_config": device_config,
+            "repetition": unit.repetition
+        })
+
+    def _load_finished_units(self, units: list, results: dict) -> list:
+        """
+        Reads the journal and the results.jsonl files of the benchmark run which is resumed.
+
+        :param units: the benchmark units of the experimental plan
+        :type units: list of BenchmarkUnit
+        :param results: the results of every application config, which are filled with the results found
+        :type results: dict
+        :return: the positions of the units which still have to be run
+        :rtype: list
+        """
+        positions = {self._get_unit_key(unit): position for position, unit in enumerate(units)}
+
+        finished = set()
+        if os.path.isfile(f"{self.store_dir}/journal.jsonl"):
+            # A line might be incomplete if the run was killed while writing it
+            for entry in _read_jsonl(f"{self.store_dir}/journal.jsonl"):
+                finished.add(_get_result_key(entry))
+
+        for idx in results:
+            filename = f"{self.store_dir}/application_config_{idx}/results.jsonl"
+            if not os.path.isfile(filename):
+                continue
+            for result in _read_jsonl(filename):
+                key = _get_result_key(result)
+                if key in finished and key in positions:
+                    results[idx][positions[key]] = result
+
+        # Units are only skipped if their result could be found, otherwise they are run again
+        finished_positions = {position for idx in results for position in results[idx]}
+        return [position for position in range(len(units)) if position not in finished_positions]
+
+    def run_benchmark_unit(self, unit: BenchmarkUnit) -> dict:
+        """
+        Runs a single benchmark unit, i.e. maps the problem, solves it and validates and evaluates the solution.
+
+        :param unit: the benchmark unit to run
+        :type unit: BenchmarkUnit
+        :return: the result record of this run or None if an error occurred
+        :rtype: dict
+        """
+        application_config = self.application_configs[unit.application_config_idx]
+        mapping_value = self.mapping_solver_device_combinations[unit.mapping_name]
+        mapping = mapping_value["mapping_instance"]
+        mapping_config = mapping_value['mapping_config'][unit.mapping_config_idx]
+        solver_value = mapping_value["solvers"][unit.solver_name]
+        solver = solver_value["solver_instance"]
+        solver_config = solver_value['solver_config'][unit.solver_config_idx]
+        device, device_config = solver_value["devices"][unit.device_idx]
+        i = unit.repetition
+
+        path = f"{self.store_dir}/application_config_{unit.application_config_idx}"
+        problem = self.application.init_problem(application_config, unit.application_config_idx, i, path,
+                                                save_problem=unit.save_problem)
+        mapped_problem, time_to_mapping, mapping_from_cache = self._map_problem(problem, mapping, mapping_config)
+        try:
+            logging.info(
+                f"Running {self.application.__class__.__name__} with config "
+                f"{application_config}"
+                f" on solver {solver.__class__.__name__} and device "
+                f"{device.get_device_name()}"
+                f" (Repetition {i}/{self.repetitions})")
+
+            if solver_config:
+                logging.info(f"Used solver config: {solver_config}")
+            if device_config:
+                logging.info(f"Used device config: {device_config}")
+            solution_raw, time_to_solve, additional_solver_information = solver.run(
+                mapped_problem, device, solver_config, store_dir=path, repetition=i)
+            if solver_config and solver_config.get("evaluate_all_samples", False):
+                # The solver returned all samples, the best valid one is reported
+                (solution_raw, processed_solution, solution_validity, solution_quality, time_to_reverse_map,
+                 time_to_process_solution, time_to_validation, time_to_evaluation,
+                 sample_statistics) = self._evaluate_all_samples(solution_raw, mapping)
+                additional_solver_information["sample_statistics"] = sample_statistics
+            else:
+                processed_solution, time_to_reverse_map = mapping.reverse_map(solution_raw)
+                try:
+                    processed_solution, time_to_process_solution = self.application.process_solution(
+                        processed_solution)
+                    solution_validity, time_to_validation = self.application.validate(
+                        processed_solution)
+                except Exception:
+                    logging.exception("Exception on processing the solution")
+                    solution_validity = False
+                    time_to_process_solution = None
+                    time_to_validation = None
+                solution_quality = None
+                time_to_evaluation = None
+            if solution_validity and solution_quality is None:
+                solution_quality, time_to_evaluation = self.application.evaluate(
+                    processed_solution)
+            return {
+                "timestamp": datetime.today().strftime('%Y-%m-%d-%H-%M-%S'),
+                "time_to_solution": sum(filter(None, [time_to_mapping, time_to_solve,
+                                                      time_to_reverse_map,
+                                                      time_to_process_solution,
+                                                      time_to_validation,
+                                                      time_to_evaluation])),
+                "time_to_solution_unit": "ms",
+                "time_to_process_solution": time_to_process_solution,
+                "time_to_process_solution_unit": "ms",
+                "time_to_validation": time_to_validation,
+                "time_to_validation_unit": "ms",
+                "time_to_evaluation": time_to_evaluation,
+                "time_to_evaluation_unit": "ms",
+                "solution_validity": solution_validity,
+                "solution_quality": solution_quality,
+                "solution_quality_unit": self.application.get_solution_quality_unit(),
+                "solution_raw": str(solution_raw),
+                "additional_solver_information": additional_solver_information,
+                # TODO Revise this (I am only doing this for now since json.dumps does not like tuples as keys for dicts
+                "time_to_solve": time_to_solve,
+                "time_to_solve_unit": "ms",
+                "repetition": i,
+                "application": self.application.__class__.__name__,
+                "application_config": application_config,
+                "mapping_config": mapping_config,
+                "time_to_reverse_map": time_to_reverse_map,
+                "time_to_reverse_map_unit": "ms",
+                "time_to_mapping": time_to_mapping,
+                "time_to_mapping_unit": "ms",
+                "mapping_from_cache": mapping_from_cache,
+                "solver_config": solver_config,
+                "mapping": mapping.__class__.__name__,
+                "solver": solver.__class__.__name__,
+                "device_class": device.__class__.__name__,
+                "device": device.get_device_name(),
+                "device_config": device_config,
+                "git_revision_number": self.git_revision_number,
+                "git_uncommitted_changes ": self.git_uncommitted_changes
+            }
+        except Exception as e:
+            logging.error(f"Error during benchmark run: {e}", exc_info=True)
+            with open(f"{path}/error.log", 'a') as fp:
+                fp.write(
+                    f"Solver: {unit.solver_name}, Device: {device.get_device_name()}, Error: {str(e)} "
+                    f"(For more information take a look at logger.log)")
+                fp.write("\n")
+            return None
+
+    def _evaluate_all_samples(self, samples: list, mapping: any) -> tuple:
+        """
+        Maps back, processes, validates and evaluates all samples returned by a solver using the batch methods of the
+        mapping and the application. The best valid sample is reported, if several samples have the same quality the
+        first one is taken. If no sample is valid, the first sample is reported.
+
+        :param samples: list of samples, ordered by the preference of the solver (e.g. by energy)
+        :type samples: list
+        :param mapping: the mapping instance which created the mapped problem
+        :type mapping: any
+        :return: the raw and the processed solution of the reported sample, its validity and quality, the times it
+                 took to reverse map, process, validate and evaluate all samples and statistics of the samples
+        :rtype: tuple(any, any, bool, float, float, float, float, float, dict)
+        """
+        solutions, time_to_reverse_map = mapping.reverse_map_batch(samples)
+        processed_solutions, time_to_process_solution = self.application.process_solutions(solutions)
+        validity, time_to_validation = self.application.validate_batch(processed_solutions)
+
+        valid_indices = np.flatnonzero(validity)
+        sample_statistics = {
+            "number_of_samples": len(samples),
+            "valid_fraction": float(np.mean(validity)) if len(samples) else 0.0
+        }
+        if len(valid_indices) == 0:
+            logging.info(f"None of the {len(samples)} samples is valid")
+            return (samples[0] if samples else None, processed_solutions[0] if samples else None, False, None,
+                    time_to_reverse_map, time_to_process_solution, time_to_validation, None, sample_statistics)
+
+        qualities, time_to_evaluation = self.application.evaluate_batch(
+            [processed_solutions[idx] for idx in valid_indices])
+        best = int(np.argmax(qualities) if self.application.is_maximization() else np.argmin(qualities))
+        best_idx = int(valid_indices[best])
+        sample_statistics["best_sample_index"] = best_idx
+        sample_statistics["quality_quantiles"] = dict(zip(
+            ["min", "q25", "median", "q75", "max"], np.quantile(qualities, [0, 0.25, 0.5, 0.75, 1]).tolist()))
+        logging.info(f"{len(valid_indices)} of {len(samples)} samples are valid, the best one is sample {best_idx} "
+                     f"with quality {qualities[best]}")
+        return (samples[best_idx], processed_solutions[best_idx], True, qualities[best].item(), time_to_reverse_map,
+                time_to_process_solution, time_to_validation, time_to_evaluation, sample_statistics)
+
+    def _map_problem(self, problem: any, mapping: any, mapping_config: dict) -> (any, float, bool):
+        """
+        Maps the problem or takes the mapped problem from the mapping cache if this problem was already mapped with
+        the same mapping config.
+
+        :param problem: the problem to be mapped
+        :type problem: any
+        :param mapping: the mapping instance
+        :type mapping: Mapping
+        :param mapping_config: the mapping config
+        :type mapping_config: dict
+        :return: mapped problem, the time it took to map it and whether it was taken from the cache
+        :rtype: tuple(any, float, bool)
+        """
+        try:
+            key = MappingCache.get_key(problem, mapping, mapping_config, self.git_revision_number)
+        except Exception as e:
+            logging.warning(f"Problem can not be fingerprinted, the mapping cache is not used: {e}")
+            key = None
+
+        if key is not None:
+            cached = self.mapping_cache.get(key, mapping)
+            if cached is not None:
+                mapped_problem, time_to_mapping = cached
+                logging.info(f"Took mapped problem of {mapping.__class__.__name__} from the mapping cache")
+                return mapped_problem, time_to_mapping, True
+
+        mapped_problem, time_to_mapping = mapping.map(problem, mapping_config)
+        if key is not None:
+            self.mapping_cache.put(key, mapping, mapped_problem, time_to_mapping)
+        return mapped_problem, time_to_mapping, False
+
+    def _store_result(self, results: dict, unit: BenchmarkUnit, position: int, result: dict) -> None:
+        """
+        Adds the result record of a finished benchmark unit and appends it to the results.jsonl of its application
+        config. Each record is only written once, results.json and results.csv are created at the end of the run.
+
+        :param results: the results of every application config, keyed by the position of the unit
+        :type results: dict
+        :param unit: the finished benchmark unit
+        :type unit: BenchmarkUnit
+        :param position: position of the unit in the experimental plan
+        :type position: int
+        :param result: the result record of the unit or None if an error occurred
+        :type result: dict
+        :rtype: None
+        """
+        if result is None:
+            return
+        results[unit.application_config_idx][position] = result
+        with open(f"{self.store_dir}/application_config_{unit.application_config_idx}/results.jsonl", 'a') as fp:
+            fp.write(json.dumps(result) + "\n")
+        # The unit is only added to the journal after its result has been saved
+        with open(f"{self.store_dir}/journal.jsonl", 'a') as fp:
+            fp.write(_get_result_key(result) + "\n")
+
+    @staticmethod
+    def _collect_all_results(results: dict) -> pd.DataFrame:
+        """
+        Collect all results of the benchmark run in a single dataframe.
+
+        :param results: the results of every application config, keyed by the position of the unit
+        :type results: dict
         :return: a pandas dataframe
         :rtype: pd.Dataframe
         """
-        dfs = []
-        for filename in glob.glob(f"{self.store_dir}/**/results.json"):
-            dfs.append(pd.read_json(filename, orient='records'))
-
-        if len(dfs) == 0:
-            logging.error("No results.json files could be found! Probably an error was previously happening.")
-        return pd.concat(dfs, axis=0, ignore_index=True)
+        records = [results[idx][position] for idx in sorted(results) for position in sorted(results[idx])]
+        if len(records) == 0:
+            logging.error("No results could be found! Probably an error was previously happening.")
+        return pd.DataFrame.from_records(records)
 
     def _save_as_csv(self, df: pd.DataFrame) -> None:
         """
@@ -582,54 +990,134 @@ class BenchmarkManager:
         """
 
         # Since these configs are dicts it is not so nice to store them in a df/csv. But this is a workaround that works for now
-        df['application_config'] = df.apply(lambda row: json.dumps(row["application_config"]), axis=1)
-        df['additional_solver_information'] = df.apply(lambda row: json.dumps(row["additional_solver_information"]),
-                                                       axis=1)
-        df['solver_config'] = df.apply(lambda row: json.dumps(row["solver_config"]), axis=1)
-        df['mapping_config'] = df.apply(lambda row: json.dumps(row["mapping_config"]), axis=1)
-        df['device_config'] = df.apply(lambda row: json.dumps(row["device_config"]), axis=1)
+        for column in _JSON_COLUMNS:
+            if column in df:
+                df[column] = df[column].map(json.dumps)
         df.to_csv(path_or_buf=f"{self.store_dir}/results.csv")
 
-    def load_results(self, input_dirs: list = None) -> pd.DataFrame:
+    def _save_as_parquet(self, df: pd.DataFrame) -> None:
         """
-        Load results from one or many results.csv files.
+        Save all the results of this experiments in a single parquet file. Next to the configs stored as json, every
+        config is flattened into typed columns named '<config column>.<key>' which can be used for filtering.
 
-        :param input_dirs: If you want to load more than 1 results.csv (default is just 1, the one from the experiment)
+        :param df: Dataframe which should be saved
+        :type df: pd.Dataframe
+        """
+        flattened = [_flatten_config(df[column], column) for column in _CONFIG_COLUMNS if column in df]
+        df = df.copy()
+        for column in _JSON_COLUMNS:
+            if column in df:
+                df[column] = df[column].map(json.dumps)
+        self._write_parquet(pd.concat([df, *flattened], axis=1))
+
+    def _write_parquet(self, df: pd.DataFrame) -> None:
+        """
+        Writes a dataframe with json and flattened config columns as results.parquet to the store directory.
+        This is skipped if pyarrow is not installed.
+
+        :param df: Dataframe which should be saved
+        :type df: pd.Dataframe
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            logging.warning("pyarrow is not installed, the results are only stored as results.csv")
+            return
+
+        for column in df.columns:
+            if not column.startswith(_FLATTENED_PREFIXES) or df[column].dtype != object:
+                continue
+            # Config values of mixed types (e.g. a string in one config and a number in another) cannot be stored
+            # as a typed column, those are stored as json
+            try:
+                pa.array(df[column], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                df[column] = df[column].map(lambda value: None if value is None else json.dumps(value))
+        df.to_parquet(f"{self.store_dir}/results.parquet")
+
+    @staticmethod
+    def _read_results(input_dirs: list, columns: list = None, filters: list = None) -> pd.DataFrame:
+        """
+        Reads the stored results of the given directories without decoding the json columns. A results.parquet is
+        preferred over a results.csv, since only the requested columns are read and the filters are pushed down to
+        the parquet reader.
+
+        :param input_dirs: directories of the experiments
         :type input_dirs: list
+        :param columns: columns to be read, all columns if None
+        :type columns: list
+        :param filters: filters in the format of pandas.read_parquet, e.g. [("application_config.nodes", ">", 4)]
+        :type filters: list
         :return: a pandas dataframe
         :rtype: pd.Dataframe
         """
-
-        if input_dirs is None:
-            input_dirs = [self.store_dir]
+        try:
+            import pyarrow  # noqa F401
+            parquet_available = True
+        except ImportError:
+            parquet_available = False
 
         dfs = []
         for input_dir in input_dirs:
-            for filename in glob.glob(f"{input_dir}/results.csv"):
-                dfs.append(pd.read_csv(filename, index_col=0, encoding="utf-8"))
+            if parquet_available and os.path.isfile(f"{input_dir}/results.parquet"):
+                dfs.append(pd.read_parquet(f"{input_dir}/results.parquet", columns=columns, filters=filters))
+            elif os.path.isfile(f"{input_dir}/results.csv"):
+                if filters is not None:
+                    raise ValueError(f"Filters can only be applied to results stored as results.parquet, but "
+                                     f"{input_dir} only contains a results.csv")
+                df = pd.read_csv(f"{input_dir}/results.csv", index_col=0, encoding="utf-8",
+                                 usecols=None if columns is None else lambda column: column in columns or
+                                 column.startswith("Unnamed"))
+                dfs.append(df.reset_index(drop=True))
+            else:
+                logging.warning(f"No results found in {input_dir}")
+
+        return pd.concat(dfs, axis=0, ignore_index=True)
+
+    def load_results(self, input_dirs: list = None, columns: list = None, filters: list = None) -> pd.DataFrame:
+        """
+        Load results from one or many results.parquet or results.csv files.
+
+        :param input_dirs: If you want to load more than 1 result file (default is just 1, the one from the experiment)
+        :type input_dirs: list
+        :param columns: columns to be loaded, all columns if None
+        :type columns: list
+        :param filters: filters in the format of pandas.read_parquet, e.g. [("application_config.nodes", ">", 4)]
+        :type filters: list
+        :return: a pandas dataframe
+        :rtype: pd.Dataframe
+        """
+
+        if input_dirs is None:
+            input_dirs = [self.store_dir]
 
-        df = pd.concat(dfs, axis=0, ignore_index=True)
-        df['application_config'] = df.apply(lambda row: json.loads(row["application_config"]), axis=1)
-        df['solver_config'] = df.apply(lambda row: json.loads(row["solver_config"]), axis=1)
-        df['additional_solver_information'] = df.apply(lambda row: json.loads(row["additional_solver_information"]),
-                                                       axis=1)
-        df['mapping_config'] = df.apply(lambda row: json.loads(row["mapping_config"]), axis=1)
-        df['device_config'] = df.apply(lambda row: json.loads(row["device_config"]), axis=1)
+        df = self._read_results(input_dirs, columns, filters)
+        for column in _JSON_COLUMNS:
+            if column in df:
+                df[column] = [json.loads(value) for value in df[column]]
 
         return df
 
-    def summarize_results(self, input_dirs: list) -> None:
+    def summarize_results(self, input_dirs: list, filters: list = None) -> None:
         """
         Helper function to summarize multiple experiments.
 
         :param input_dirs: list of directories
         :type input_dirs: list
+        :param filters: filters in the format of pandas.read_parquet, e.g. [("application_config.nodes", ">", 4)]
+        :type filters: list
         :rtype: None
         """
         self._create_store_dir(tag="summary")
-        df = self.load_results(input_dirs)
-        # Deep copy, else it messes with the json.loads in save_as_csv
-        self._save_as_csv(df.copy())
+        # The combined results are stored without decoding the json columns
+        df = self._read_results(input_dirs, filters=filters)
+        if any(column.startswith(_FLATTENED_PREFIXES) for column in df.columns):
+            self._write_parquet(df.copy())
+        df.drop(columns=[column for column in df.columns if column.startswith(_FLATTENED_PREFIXES)]).to_csv(
+            path_or_buf=f"{self.store_dir}/results.csv")
+
+        # For the plots only the needed columns are loaded
+        df = self.load_results(input_dirs, columns=_VISUALIZATION_COLUMNS, filters=filters)
         self.visualize_results(df, self.store_dir)
 
     def visualize_results(self, df: pd.DataFrame, store_dir: str = None) -> None:
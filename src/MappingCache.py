@@ -0,0 +1,169 @@
+#  Copyright 2021 The QUARK Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+
+class _FingerprintPickler(pickle.Pickler):
+    """
+    Pickler used to fingerprint objects. Since the iteration order of sets of strings differs between processes, sets
+    are replaced by the sorted fingerprints of their elements.
+    """
+
+    def __init__(self, file: io.BytesIO):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def persistent_id(self, obj: any) -> any:
+        if isinstance(obj, (set, frozenset)):
+            return type(obj).__name__, sorted(_fingerprint(value) for value in obj)
+        return None
+
+
+def _fingerprint(obj: any) -> str:
+    """
+    Returns a fingerprint of the content of an object, which is the same in every process.
+
+    :param obj: the object
+    :type obj: any
+    :return: hex digest of the object
+    :rtype: str
+    """
+    buffer = io.BytesIO()
+    _FingerprintPickler(buffer).dump(obj)
+    return hashlib.sha256(buffer.getvalue()).hexdigest()
+
+
+class MappingCache:
+    """
+    Content addressed cache of mapped problems. A mapped problem is identified by the fingerprint of the problem, the
+    mapping and the mapping config. Entries are kept in memory with LRU eviction and, if a cache directory is given,
+    additionally on disk, so that they can be shared between worker processes and benchmark runs.
+
+    Besides the mapped problem, the state of the mapping instance is cached as well, since it is needed by
+    reverse_map. Entries are stored pickled, so every lookup returns a fresh copy which may be modified by the solver.
+    """
+
+    def __init__(self, max_entries: int = 16, cache_dir: str = None):
+        """
+        Constructor method
+
+        :param max_entries: maximum number of entries kept in memory, 0 disables the memory tier
+        :type max_entries: int
+        :param cache_dir: directory of the on-disk tier, which is disabled if None
+        :type cache_dir: str
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        if cache_dir is not None:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def get_key(problem: any, mapping: any, mapping_config: dict, revision: str = None) -> str:
+        """
+        Returns the key of a mapped problem.
+
+        :param problem: the problem which is mapped
+        :type problem: any
+        :param mapping: the mapping instance
+        :type mapping: any
+        :param mapping_config: the mapping config
+        :type mapping_config: dict
+        :param revision: revision of the code base, so that entries on disk are not reused after the code changed
+        :type revision: str
+        :return: the key of the mapped problem
+        :rtype: str
+        """
+        fingerprint = hashlib.sha256(_fingerprint(problem).encode())
+        fingerprint.update(json.dumps([f"{type(mapping).__module__}.{type(mapping).__qualname__}", mapping_config,
+                                       revision], sort_keys=True, default=str).encode())
+        return fingerprint.hexdigest()
+
+    def get(self, key: str, mapping: any) -> (any, float):
+        """
+        Looks up a mapped problem and restores the state of the mapping instance.
+
+        :param key: the key of the mapped problem
+        :type key: str
+        :param mapping: the mapping instance whose state is restored
+        :type mapping: any
+        :return: mapped problem and the time it originally took to map it, None if the entry is not cached
+        :rtype: tuple(any, float)|None
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.cache_dir is not None and os.path.isfile(f"{self.cache_dir}/{key}.pkl"):
+            with open(f"{self.cache_dir}/{key}.pkl", 'rb') as f:
+                entry = f.read()
+            self._add_to_memory(key, entry)
+        else:
+            return None
+
+        mapped_problem, time_to_mapping, mapping_state = pickle.loads(entry)
+        mapping.__dict__.update(mapping_state)
+        return mapped_problem, time_to_mapping
+
+    def put(self, key: str, mapping: any, mapped_problem: any, time_to_mapping: float) -> None:
+        """
+        Stores a mapped problem together with the current state of the mapping instance.
+
+        :param key: the key of the mapped problem
+        :type key: str
+        :param mapping: the mapping instance which created the mapped problem
+        :type mapping: any
+        :param mapped_problem: the mapped problem
+        :type mapped_problem: any
+        :param time_to_mapping: the time it took to map the problem
+        :type time_to_mapping: float
+        :rtype: None
+        """
+        try:
+            entry = pickle.dumps((mapped_problem, time_to_mapping, mapping.__dict__),
+                                 protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logging.warning(f"Mapped problem of {mapping.__class__.__name__} can not be cached: {e}")
+            return
+
+        self._add_to_memory(key, entry)
+        if self.cache_dir is not None:
+            # Write to a temporary file first, so that other processes never read an incomplete entry
+            tmp_file = f"{self.cache_dir}/{key}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(entry)
+            os.replace(tmp_file, f"{self.cache_dir}/{key}.pkl")
+
+    def _add_to_memory(self, key: str, entry: bytes) -> None:
+        """
+        Adds an entry to the memory tier and evicts the least recently used entries if it is full.
+
+        :param key: the key of the mapped problem
+        :type key: str
+        :param entry: the pickled entry
+        :type entry: bytes
+        :rtype: None
+        """
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
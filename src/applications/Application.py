@@ -12,9 +12,14 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import logging
+import random
 from abc import ABC, abstractmethod
+from time import time
 from typing import final
 
+import numpy as np
+
 from BenchmarkManager import _get_instance_with_sub_options
 
 
@@ -94,7 +99,7 @@ class Application(ABC):
         return False
 
     @final
-    def init_problem(self, config, conf_idx: int, iter_count: int, path):
+    def init_problem(self, config, conf_idx: int, iter_count: int, path, save_problem: bool = None):
         """
         This method is called on every iteration and calls generate_problem if necessary.
         conf_idx identifies the application configuration.
@@ -102,8 +107,9 @@ class Application(ABC):
         called several times with the same conf_idx and rep_count. In this case
         the problem will be the same if conf_idx and rep_count are both the same.
 
-        The implementation assumes that the loop over the rep_count is within the loop
-        over the different application configurations (conf_idx).
+        The global random number generators are seeded based on conf_idx and rep_count while the problem is generated,
+        so the problem does not depend on the process or the order in which it is generated. This allows the benchmark
+        manager to execute the benchmark in several worker processes.
 
         :param config: the application configuration
         :type config: dict
@@ -113,6 +119,8 @@ class Application(ABC):
         :type iter_count: int
         :param path: the path used to save each newly generated problem instance
         :type path: str
+        :param save_problem: whether to save the problem instance. If None, it is saved whenever it is newly generated
+        :type save_problem: bool
         :return: the current problem instance
         :rtype: any
         """
@@ -125,8 +133,22 @@ class Application(ABC):
         if key in self.problems:
             self.problem = self.problems[key]
         else:
-            self.problem = self.generate_problem(config, iter_count)
+            # If the problem is not regenerated on every iteration, it is always generated as in the first repetition
+            problem_iter_count = iter_count if key != "dummy" else 1
+            np_state = np.random.get_state()
+            py_state = random.getstate()
+            np.random.seed([conf_idx, problem_iter_count])
+            random.seed(f"{conf_idx}-{problem_iter_count}")
+            try:
+                self.problem = self.generate_problem(config, problem_iter_count)
+            finally:
+                # Restore the previous state so that the randomness of the solvers is not affected
+                np.random.set_state(np_state)
+                random.setstate(py_state)
             self.problems[key] = self.problem
+            if save_problem is None:
+                save_problem = True
+        if save_problem:
             self.save(path, iter_count)
         return self.problem
 
@@ -183,6 +205,66 @@ class Application(ABC):
         """
         pass
 
+    def process_solutions(self, solutions: list) -> (list, float):
+        """
+        Processes a batch of solutions, e.g. all samples returned by an annealer. Solutions which are None or can not be
+        processed are returned as None. The default calls process_solution for every solution, applications can
+        overwrite this with a vectorized implementation.
+
+        :param solutions: list of solutions
+        :type solutions: list
+        :return: list of processed solutions and the time it took to process them
+        :rtype: tuple(list, float)
+        """
+        start = time() * 1000
+        processed_solutions = []
+        for solution in solutions:
+            try:
+                processed_solution = None if solution is None else self.process_solution(solution)[0]
+            except Exception as e:
+                logging.warning(f"Exception on processing a solution: {e}")
+                processed_solution = None
+            processed_solutions.append(processed_solution)
+        return processed_solutions, round(time() * 1000 - start, 3)
+
+    def validate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Checks which solutions of a batch of processed solutions are valid, solutions which are None are invalid. The
+        default calls validate for every solution.
+
+        :param solutions: list of processed solutions
+        :type solutions: list
+        :return: boolean array whether the solutions are valid and the time it took to validate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        validity = np.array([solution is not None and bool(self.validate(solution)[0]) for solution in solutions],
+                            dtype=bool)
+        return validity, round(time() * 1000 - start, 3)
+
+    def evaluate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Evaluates a batch of valid solutions. The default calls evaluate for every solution.
+
+        :param solutions: list of valid processed solutions
+        :type solutions: list
+        :return: array with the evaluation of every solution and the time it took to evaluate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        qualities = np.array([self.evaluate(solution)[0] for solution in solutions], dtype=float)
+        return qualities, round(time() * 1000 - start, 3)
+
+    def is_maximization(self) -> bool:
+        """
+        Returns whether a higher evaluation is better, which is used to pick the best of several solutions. Returns
+        False if not overwritten.
+
+        :return: whether the evaluation is maximized
+        :rtype: bool
+        """
+        return False
+
     @abstractmethod
     def save(self, path: str, iter_count: int) -> None:
         """
@@ -12,6 +12,7 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import logging
 from abc import ABC, abstractmethod
 from time import time
 from BenchmarkManager import _get_instance_with_sub_options
@@ -57,6 +58,27 @@ class Mapping(ABC):
         """
         return solution, 0
 
+    def reverse_map_batch(self, solutions: list) -> (list, float):
+        """
+        Maps a batch of solutions back to the original problem, e.g. all samples returned by an annealer. Solutions
+        which can not be mapped back are returned as None. The default calls reverse_map for every solution.
+
+        :param solutions: list of solutions
+        :type solutions: list
+        :return: list of mapped solutions and the time it took to create them
+        :rtype: tuple(list, float)
+        """
+        start = time() * 1000
+        mapped_solutions = []
+        for solution in solutions:
+            try:
+                mapped_solution = self.reverse_map(solution)[0]
+            except Exception as e:
+                logging.warning(f"Exception on reverse mapping a solution: {e}")
+                mapped_solution = None
+            mapped_solutions.append(mapped_solution)
+        return mapped_solutions, round(time() * 1000 - start, 3)
+
     @abstractmethod
     def get_parameter_options(self) -> dict:
         """
@@ -0,0 +1,96 @@
+#  Copyright 2021 The QUARK Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import networkx
+import numpy as np
+
+
+def create_edge_index(graph: networkx.MultiDiGraph) -> dict:
+    """
+    Creates an index of the edge weights of a PVC graph, so that the weight of an edge can be looked up without
+    traversing the parallel edges of the graph. The weights are stored in dense arrays of shape
+    (nodes, nodes, configs, tools, configs, tools) indexed by (node_u, node_v, c_start, t_start, c_end, t_end), where
+    non-existing edges are NaN:
+
+    - weights: the weight of the first of the parallel edges, which is the one used to evaluate a tour
+    - min_weights: the minimal weight of the parallel edges
+    - max_weights: the maximal weight of the parallel edges
+
+    Nodes, configs and tools are indexed by their position in the lists 'nodes', 'configs' and 'tools', with the
+    corresponding lookup dicts 'node_index', 'config_index' and 'tool_index'. Additionally, 'seams' holds the seam of
+    every node and 'seam_index' maps every seam to the indices of its nodes.
+
+    :param graph: the PVC graph
+    :type graph: networkx.MultiDiGraph
+    :return: the edge index
+    :rtype: dict
+    """
+    nodes = list(graph.nodes)
+    configs = [x[2]['c_start'] for x in graph.edges(data=True)]
+    configs = list(set(configs + [x[2]['c_end'] for x in graph.edges(data=True)]))
+    tools = [x[2]['t_start'] for x in graph.edges(data=True)]
+    tools = list(set(tools + [x[2]['t_end'] for x in graph.edges(data=True)]))
+
+    node_index = {node: i for i, node in enumerate(nodes)}
+    config_index = {c: i for i, c in enumerate(configs)}
+    tool_index = {t: i for i, t in enumerate(tools)}
+    seams = np.array([node[0] for node in nodes])
+    shape = (len(nodes), len(nodes), len(configs), len(tools), len(configs), len(tools))
+
+    edges = [(node_index[u], node_index[v], config_index[data['c_start']], tool_index[data['t_start']],
+              config_index[data['c_end']], tool_index[data['t_end']]) for u, v, data in graph.edges(data=True)]
+    edge_weights = np.array([data['weight'] for _, _, data in graph.edges(data=True)], dtype=float)
+    flat_index = np.ravel_multi_index(tuple(np.array(edges, dtype=int).reshape(-1, 6).T), shape)
+
+    _, first = np.unique(flat_index, return_index=True)
+    weights = np.full(np.prod(shape), np.nan)
+    weights[flat_index[first]] = edge_weights[first]
+    min_weights = np.full(np.prod(shape), np.inf)
+    np.minimum.at(min_weights, flat_index, edge_weights)
+    max_weights = np.full(np.prod(shape), -np.inf)
+    np.maximum.at(max_weights, flat_index, edge_weights)
+    missing = np.isnan(weights)
+    min_weights[missing] = np.nan
+    max_weights[missing] = np.nan
+
+    return {
+        "nodes": nodes,
+        "configs": configs,
+        "tools": tools,
+        "node_index": node_index,
+        "config_index": config_index,
+        "tool_index": tool_index,
+        "seams": seams,
+        "seam_index": {seam: np.flatnonzero(seams == seam) for seam in np.unique(seams).tolist()},
+        "weights": weights.reshape(shape),
+        "min_weights": min_weights.reshape(shape),
+        "max_weights": max_weights.reshape(shape)
+    }
+
+
+def get_edge_index(graph: networkx.MultiDiGraph) -> dict:
+    """
+    Returns the edge index stored in the graph attribute 'edge_index' by PVC.generate_problem. If the graph has no
+    (up-to-date) edge index, it is created and stored in the graph.
+
+    :param graph: the PVC graph
+    :type graph: networkx.MultiDiGraph
+    :return: the edge index
+    :rtype: dict
+    """
+    edge_index = graph.graph.get("edge_index")
+    if edge_index is None or len(edge_index["nodes"]) != graph.number_of_nodes():
+        edge_index = create_edge_index(graph)
+        graph.graph["edge_index"] = edge_index
+    return edge_index
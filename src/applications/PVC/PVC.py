@@ -12,10 +12,11 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-import itertools
 import logging
+from functools import lru_cache
 from time import time
 import os
+import pickle
 from typing import TypedDict, Union
 
 import networkx
@@ -23,6 +24,7 @@ import networkx as nx
 import numpy as np
 
 from applications.Application import *
+from applications.PVC.EdgeIndex import create_edge_index, get_edge_index
 from applications.PVC.mappings.ISING import Ising
 from applications.PVC.mappings.QUBO import Qubo
 from applications.PVC.mappings.Direct import Direct
@@ -98,28 +100,35 @@ class PVC(Application):
         """
         seams: int
 
-    def generate_problem(self, config: Config, iter_count: int) -> networkx.Graph:
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _get_reference_graph() -> networkx.MultiDiGraph:
         """
-        Uses the reference graph to generate a problem for a given config.
+        Reads the reference graph. It is only read once per process, so it must not be modified.
 
-        :param config: Config specifying the number of seams for the problem
-        :type config: Config
-        :param iter_count: the iteration count
-        :type iter_count: int
-        :return: networkx graph representing the problem
-        :rtype: networkx.Graph
+        :return: the reference graph
+        :rtype: networkx.MultiDiGraph
         """
+        return nx.read_gpickle(os.path.join(os.path.dirname(__file__), "reference_graph.gpickle"))
 
-        if config is None:
-            config = {"seams": 3}
-        seams = config['seams']
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _create_problem(seams: int) -> bytes:
+        """
+        Creates the problem graph with the given number of seams out of the reference graph. The graph is only created
+        once per process and number of seams. It is returned pickled, so that every problem is a separate copy.
 
-        # Read in the original graph
-        graph = nx.read_gpickle(os.path.join(os.path.dirname(__file__), "reference_graph.gpickle"))
+        :param seams: number of seams
+        :type seams: int
+        :return: the pickled problem graph
+        :rtype: bytes
+        """
+        # The original graph is only read once
+        reference_graph = PVC._get_reference_graph()
 
         # Remove seams until the target number of seams is reached
         # Get number of seam in graph
-        seams_in_graph = list(set([x[0] for x in graph.nodes]))
+        seams_in_graph = list(set([x[0] for x in reference_graph.nodes]))
         seams_in_graph.sort()
         # Remove 0 as we always need the base node 0 (which is not a seam anyway)
         seams_in_graph.remove(0)
@@ -128,47 +137,63 @@ class PVC(Application):
             raise ValueError(f"Too many seams! The original graph has less seams than that!")
 
         unwanted_seams = seams_in_graph[-len(seams_in_graph) + seams:]
-        unwanted_nodes = [x for x in graph.nodes if x[0] in unwanted_seams]
-        # Remove one node after another
-        for node in unwanted_nodes:
-            graph.remove_node(node)
+        # Copy the subgraph without the unwanted seams, keeping the order of the nodes and edges
+        wanted_nodes = [x for x in reference_graph.nodes if x[0] not in unwanted_seams]
+        graph = nx.MultiDiGraph(**reference_graph.graph)
+        graph.add_nodes_from((node, reference_graph.nodes[node].copy()) for node in wanted_nodes)
+        graph.add_edges_from((u, v, key, data.copy()) for u in wanted_nodes for v, edges in reference_graph[u].items()
+                             if v in graph for key, data in edges.items())
 
         if not nx.is_strongly_connected(graph):
             logging.error("Graph is not connected!")
             raise ValueError(f"Graph is not connected!")
 
-        config = [x[2]['c_start'] for x in graph.edges(data=True)]
-        config = list(set(config + [x[2]['c_end'] for x in graph.edges(data=True)]))
-
-        tool = [x[2]['t_start'] for x in graph.edges(data=True)]
-        tool = list(set(tool + [x[2]['t_end'] for x in graph.edges(data=True)]))
+        # Index of the edge weights used by the mappings, solvers and the evaluation
+        edge_index = create_edge_index(graph)
+        nodes, config, tool = edge_index["nodes"], edge_index["configs"], edge_index["tools"]
 
         # Now lets fill the rest of the missing edges with high values
-        # get current edges
-        current_edges = [(edge[0], edge[1], edge[2]['t_start'], edge[2]['t_end'], edge[2]['c_start'], edge[2]['c_end'])
-                         for edge in graph.edges(data=True)]
-
-        # get all possible edges
-        all_possible_edges = list(itertools.product(list(graph.nodes), repeat=2))
-        all_possible_edges = [(edges[0], edges[1], t_start, t_end, c_start, c_end) for edges in all_possible_edges for
-                              c_end in config for c_start in config for t_end in tool
-                              for t_start in tool if edges[0] != edges[1]]
-        # calculate missing edges
-        missing_edges = [item for item in all_possible_edges if item not in current_edges]
-        # add these edges with very high values
-        for edge in missing_edges:
-            weight = 100000  # TODO Check if this value is fine
-            # c_start, t_start, c_end, t_end
-            graph.add_edge(edge[0], edge[1], c_start=edge[4], t_start=edge[2], c_end=edge[5], t_end=edge[3],
-                           weight=weight)
+        weight = 100000  # TODO Check if this value is fine
+        missing = np.isnan(edge_index["weights"])
+        missing[np.arange(len(nodes)), np.arange(len(nodes))] = False
+        # the missing edges are added ordered by (u, v, c_end, c_start, t_end, t_start)
+        missing_edges = np.argwhere(missing.transpose((0, 1, 4, 2, 5, 3)))
+        graph.add_edges_from((nodes[u], nodes[v], {"c_start": config[c_start], "t_start": tool[t_start],
+                                                   "c_end": config[c_end], "t_end": tool[t_end], "weight": weight})
+                             for u, v, c_end, c_start, t_end, t_start in missing_edges.tolist())
+        for weights in ["weights", "min_weights", "max_weights"]:
+            edge_index[weights][missing] = weight
+        graph.graph["edge_index"] = edge_index
+
+        return pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def generate_problem(self, config: Config, iter_count: int) -> networkx.Graph:
+        """
+        Uses the reference graph to generate a problem for a given config.
+
+        :param config: Config specifying the number of seams for the problem
+        :type config: Config
+        :param iter_count: the iteration count
+        :type iter_count: int
+        :return: networkx graph representing the problem
+        :rtype: networkx.Graph
+        """
+
+        if config is None:
+            config = {"seams": 3}
+        seams = config['seams']
+
+        problem = self._create_problem(seams)
+        graph = pickle.loads(problem)
+        edge_index = graph.graph["edge_index"]
 
         logging.info("Created PVC problem with the following attributes:")
         logging.info(f" - Number of seams: {seams}")
-        logging.info(f" - Number of different configs: {len(config)}")
-        logging.info(f" - Number of different tools: {len(tool)}")
+        logging.info(f" - Number of different configs: {len(edge_index['configs'])}")
+        logging.info(f" - Number of different tools: {len(edge_index['tools'])}")
 
         self.application = graph
-        return graph.copy()
+        return pickle.loads(problem)
 
     def process_solution(self, solution: dict) -> (list, bool):
         """
@@ -253,22 +278,22 @@ class PVC(Application):
         :rtype: tuple(float, float)
         """
         start = time() * 1000
+        edge_index = get_edge_index(self.application)
+        # indices of the node, config and tool of every visit
+        visits = np.array([(edge_index["node_index"][node], edge_index["config_index"][config],
+                            edge_index["tool_index"][tool]) for node, config, tool in solution]).T
         # get the total distance
-        total_dist = 0
-        for idx, node in enumerate(solution[:-1]):
-            edge = next(item for item in list(self.application[solution[idx][0]][solution[idx + 1][0]].values()) if
-                        item["c_start"] == solution[idx][1] and item["t_start"] == solution[idx][2] and item[
-                            "c_end"] == solution[idx + 1][1] and item["t_end"] == solution[idx + 1][2])
-            dist = edge['weight']
-            total_dist += dist
+        distances = edge_index["weights"][visits[0, :-1], visits[0, 1:], visits[1, :-1], visits[2, :-1],
+                                          visits[1, 1:], visits[2, 1:]]
+        total_dist = sum(distances.tolist())
 
         logging.info(f"Total distance (without return): {total_dist}")
 
         # add distance between start and end point to complete cycle
-        return_edge = next(item for item in list(self.application[solution[0][0]][solution[-1][0]].values()) if
-                           item["c_start"] == solution[0][1] and item["t_start"] == solution[0][2] and item[
-                               "c_end"] == solution[-1][1] and item["t_end"] == solution[-1][2])
-        return_distance = return_edge['weight']
+        return_distance = edge_index["weights"][visits[0, 0], visits[0, -1], visits[1, 0], visits[2, 0],
+                                                visits[1, -1], visits[2, -1]].item()
+        if np.isnan(distances).any() or np.isnan(return_distance):
+            raise ValueError("The tour contains an edge which is not part of the graph")
         logging.info(f"Distance between start and end: {return_distance}")
 
         # get distance for full cycle
@@ -277,5 +302,56 @@ class PVC(Application):
 
         return distance, round(time() * 1000 - start, 3)
 
+    def validate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Checks which routes of a batch visit all seams and the home position.
+
+        :param solutions: list of routes
+        :type solutions: list
+        :return: boolean array whether the routes are valid and the time it took to validate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        indices = [idx for idx, solution in enumerate(solutions)
+                   if solution is not None and None not in solution]
+        if len({len(solutions[idx]) for idx in indices}) > 1:
+            return super().validate_batch(solutions)
+
+        validity = np.zeros(len(solutions), dtype=bool)
+        if indices:
+            seams = np.sort([[visit[0][0] for visit in solutions[idx]] for idx in indices], axis=1)
+            # every seam is visited exactly once if no seam appears twice in the route
+            validity[indices] = np.all(np.diff(seams, axis=1) != 0, axis=1)
+        return validity, round(time() * 1000 - start, 3)
+
+    def evaluate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Calculates the tour lengths of a batch of valid routes.
+
+        :param solutions: list of routes
+        :type solutions: list
+        :return: array with the tour length of every route and the time it took to calculate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        if len({len(solution) for solution in solutions}) > 1:
+            return super().evaluate_batch(solutions)
+        if not solutions:
+            return np.empty(0), round(time() * 1000 - start, 3)
+
+        edge_index = get_edge_index(self.application)
+        # indices of the node, config and tool of every visit, shape (3, number of routes, length of the routes)
+        visits = np.array([[(edge_index["node_index"][node], edge_index["config_index"][config],
+                             edge_index["tool_index"][tool]) for node, config, tool in solution]
+                           for solution in solutions]).transpose((2, 0, 1))
+        distances = edge_index["weights"][visits[0, :, :-1], visits[0, :, 1:], visits[1, :, :-1], visits[2, :, :-1],
+                                          visits[1, :, 1:], visits[2, :, 1:]]
+        # distance between start and end point to complete the cycle, looked up as in evaluate
+        return_distances = edge_index["weights"][visits[0, :, 0], visits[0, :, -1], visits[1, :, 0], visits[2, :, 0],
+                                                 visits[1, :, -1], visits[2, :, -1]]
+        if np.isnan(distances).any() or np.isnan(return_distances).any():
+            raise ValueError("A tour contains an edge which is not part of the graph")
+        return distances.sum(axis=1) + return_distances, round(time() * 1000 - start, 3)
+
     def save(self, path: str, iter_count: int) -> None:
         nx.write_gpickle(self.application, f"{path}/graph.gpickle")
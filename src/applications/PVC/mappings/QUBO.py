@@ -12,15 +12,17 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-import itertools
 import logging
-from collections import defaultdict
 from typing import TypedDict, Union
 
 import networkx
+import numpy as np
+from scipy.sparse import coo_matrix
 
 from applications.Mapping import *
+from applications.PVC.EdgeIndex import get_edge_index
 from solvers.Annealer import Annealer
+from solvers.ParallelTempering import ParallelTempering
 
 
 class Qubo(Mapping):
@@ -33,7 +35,7 @@ class Qubo(Mapping):
         Constructor method
         """
         super().__init__()
-        self.solver_options = ["Annealer"]
+        self.solver_options = ["Annealer", "ParallelTempering"]
 
     def get_parameter_options(self) -> dict:
         """
@@ -82,18 +84,15 @@ class Qubo(Mapping):
         start = time() * 1000
         lagrange = None
         lagrange_factor = config['lagrange_factor']
-        weight = 'weight'
 
         # Inspired by https://dnx.readthedocs.io/en/latest/_modules/dwave_networkx/algorithms/tsp.html
         n = graph.number_of_nodes()
         # we only need this number of timesteps since we only need to visit 1 node per seam (plus we start and end at the base node)
         timesteps = int((n - 1) / 2 + 1)
-        # Let`s get the number of different configs and tools
-        config = [x[2]['c_start'] for x in graph.edges(data=True)]
-        config = list(set(config + [x[2]['c_end'] for x in graph.edges(data=True)]))
-
-        tool = [x[2]['t_start'] for x in graph.edges(data=True)]
-        tool = list(set(tool + [x[2]['t_end'] for x in graph.edges(data=True)]))
+        # Let`s get the different configs and tools
+        edge_index = get_edge_index(graph)
+        config = edge_index["configs"]
+        tool = edge_index["tools"]
 
         if lagrange is None:
             # If no lagrange parameter provided, set to 'average' tour length.
@@ -104,7 +103,8 @@ class Qubo(Mapping):
                 weights = [x[2]['weight'] for x in graph.edges(data=True)]
                 # At the moment we need to filter out the very high artificial values we added during generate_problem
                 # as this would mess up the lagrange
-                weights = list(filter(lambda a: a != max(weights), weights))
+                max_weight = max(weights)
+                weights = [w for w in weights if w != max_weight]
                 lagrange = sum(weights) / len(weights) * timesteps
             else:
                 lagrange = 2
@@ -118,90 +118,75 @@ class Qubo(Mapping):
             msg = "graph must be a complete graph with at least 3 nodes or empty"
             raise ValueError(msg)
 
-        # Creating the QUBO
-        q = defaultdict(float)
-
         # We need to implement the following constrains:
         # Only visit 1 node of each seam
         # Don`t visit nodes twice (even if their config/tool is different)
         # We only need to visit base node at the once since this path from last node to base node is unique anyway
-
-        # Constraint to only visit a node/seam once
-        for node in graph:  # for all nodes in the graph
-            for pos_1 in range(timesteps):  # for number of timesteps
-                for t_start in tool:
-                    for c_start in config:
-                        q[((node, c_start, t_start, pos_1),
-                           (node, c_start, t_start,
-                            pos_1))] -= lagrange  # lagrange  # nodes to itself on the same timestep
-                        for t_end in tool:
-                            # for all configs and tools
-                            for c_end in config:
-                                if c_start != c_end or t_start != t_end:
-                                    q[((node, c_start, t_start, pos_1),
-                                       (node, c_end, t_end, pos_1))] += 1.0 * lagrange
-                                for pos_2 in range(pos_1 + 1,
-                                                   timesteps):  # For each following timestep set value for u -> u
-                                    q[((node, c_start, t_start, pos_1),
-                                       (node, c_end, t_end,
-                                        pos_2))] += 2.0 * lagrange  # penalize visiting same node again in another timestep
-
-                                    # penalize visiting other node of same seam
-                                    if node != (0, 0):
-                                        # (0,0) is the base node, it is not a seam
-                                        # get the other nodes of the same seam
-                                        other_seam_nodes = [x for x in graph.nodes if x[0] == node[0] and x[1] != node]
-                                        for other_seam_node in other_seam_nodes:
-                                            q[((node, c_start, t_start, pos_1),
-                                               (other_seam_node, c_end, t_end,
-                                                pos_2))] += 2.0 * lagrange  # penalize visiting other node of same seam
-
-        # Constraint to only visit a single node in a single timestep
-        for pos in range(timesteps):  # for all timesteps
-            for node_1 in graph:  # for all nodes
-                for t_start in tool:
-                    for c_start in config:
-                        q[((node_1, c_start, t_start, pos),
-                           (node_1, c_start, t_start, pos))] -= lagrange
-                        for t_end in tool:
-                            for c_end in config:
-                                # if c_start != c_end or t_start != t_end:
-                                #     Q[((node_1, c_start, t_start, pos),
-                                #        (node_1, c_end, t_end, pos))] += lagrange
-                                for node_2 in set(graph) - {node_1}:  # for all nodes except node1 -> node1
-                                    # QUBO coefficient is 2*lagrange, but we are placing this value
-                                    # above *and* below the diagonal, so we put half in each position.
-                                    q[((node_1, c_start, t_start, pos), (node_2, c_end, t_end,
-                                                                         pos))] += lagrange  # penalize from node1 -> node2 in the same timestep
-
-        # Objective that minimizes distance
-        for u, v in itertools.combinations(graph.nodes, 2):
-            for pos in range(timesteps):
-                for t_start in tool:
-                    for t_end in tool:
-                        for c_start in config:
-                            for c_end in config:
-                                nextpos = (pos + 1) % timesteps
-                                edge_u_v = next(item for item in list(graph[u][v].values()) if
-                                                item["c_start"] == c_start and item["t_start"] == t_start and item[
-                                                    "c_end"] == c_end and item["t_end"] == t_end)
-                                # since it is the other direction we switch start and end of tool and config
-                                edge_v_u = next(item for item in list(graph[v][u].values()) if
-                                                item["c_start"] == c_end and item["t_start"] == t_end and item[
-                                                    "c_end"] == c_start and item["t_end"] == t_start)
-                                # going from u -> v
-                                q[((u, c_start, t_start, pos), (v, c_end, t_end, nextpos))] += edge_u_v[weight]
-
-                                # going from v -> u
-                                q[((v, c_end, t_end, pos), (u, c_start, t_start, nextpos))] += edge_v_u[weight]
+        # Every binary variable (node, config, tool, timestep) gets the index ((node * K + k) * timesteps + timestep),
+        # where k = config * len(tool) + tool enumerates the config/tool combinations.
+        nodes = edge_index["nodes"]
+        variables = [(node, c, t, pos) for node in nodes for c in config for t in tool for pos in range(timesteps)]
+        k = len(config) * len(tool)
+        weights = edge_index["weights"].reshape((n, n, k, k))
+        if np.isnan(weights[~np.eye(n, dtype=bool)]).any():
+            raise ValueError("graph must contain an edge for every pair of nodes and config/tool combination")
+        rows, cols, values = [], [], []
+
+        def _add_terms(node_mask, term_values, positions):
+            """
+            Adds the terms between (node_1, k_1, pos_1) and (node_2, k_2, pos_2) for all (pos_1, pos_2) in positions
+            and all node and config/tool combinations in node_mask (of shape (n, n, k, k)).
+            """
+            node_1, node_2, k_1, k_2 = np.nonzero(node_mask)
+            pos_1, pos_2 = np.array(positions, dtype=int).reshape(-1, 2).T
+            rows.append((((node_1 * k + k_1) * timesteps)[None, :] + pos_1[:, None]).ravel())
+            cols.append((((node_2 * k + k_2) * timesteps)[None, :] + pos_2[:, None]).ravel())
+            values.append(np.tile(term_values[node_1, node_2, k_1, k_2], len(pos_1)))
+
+        same_node = np.eye(n, dtype=bool)
+        same_var = (same_node[:, :, None, None] & np.eye(k, dtype=bool)[None, None, :, :])
+        every_var = np.ones((n, n, k, k), dtype=bool)
+        # (0,0) is the base node, it is not a seam
+        seam = edge_index["seams"]
+        same_seam = (seam[:, None] == seam[None, :]) & np.array([node != (0, 0) for node in nodes])[:, None]
+
+        # Constraint to only visit a node/seam once and to only visit a single node in a single timestep:
+        # Every variable gets -lagrange from both constraints, every pair of different variables in the same timestep
+        # gets +lagrange (the QUBO coefficient is 2*lagrange, but we are placing this value above *and* below the
+        # diagonal, so we put half in each position).
+        _add_terms(every_var, np.where(same_var, -lagrange - lagrange, 1.0 * lagrange),
+                   [(pos, pos) for pos in range(timesteps)])
+
+        # Penalize visiting the same node again in a later timestep and visiting another node of the same seam
+        # (the nodes of the same seam include the node itself, which is why it gets both penalties).
+        penalty = 2.0 * lagrange * same_node + 2.0 * lagrange * same_seam
+        penalty_mask = np.broadcast_to((same_node | same_seam)[:, :, None, None], (n, n, k, k))
+        _add_terms(penalty_mask, np.broadcast_to(penalty[:, :, None, None], (n, n, k, k)),
+                   [(pos_1, pos_2) for pos_1 in range(timesteps) for pos_2 in range(pos_1 + 2, timesteps)])
+
+        # Objective that minimizes distance: going from node_1 in a timestep to node_2 in the next timestep, which adds
+        # to the penalties above.
+        travel = np.where(same_node[:, :, None, None], 0.0, weights)
+        _add_terms(penalty_mask | ~same_node[:, :, None, None], penalty[:, :, None, None] + travel,
+                   [(pos, pos + 1) for pos in range(timesteps - 1)])
+        # going back from the last timestep to the first one
+        _add_terms(np.broadcast_to(~same_node[:, :, None, None], (n, n, k, k)), travel, [(timesteps - 1, 0)])
+
+        qubo = coo_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(len(variables), len(variables))).tocsr()
+        row_indices = np.repeat(np.arange(len(variables)), np.diff(qubo.indptr))
+        q = {(variables[row], variables[col]): value for row, col, value in
+             zip(row_indices.tolist(), qubo.indices.tolist(), qubo.data.tolist())}
 
         logging.info("Created Qubo")
 
         return {"Q": q}, round(time() * 1000 - start, 3)
 
-    def get_solver(self, solver_option: str) -> Union[Annealer]:
+    def get_solver(self, solver_option: str) -> Union[Annealer, ParallelTempering]:
 
         if solver_option == "Annealer":
             return Annealer()
+        elif solver_option == "ParallelTempering":
+            return ParallelTempering()
         else:
             raise NotImplementedError(f"Solver Option {solver_option} not implemented")
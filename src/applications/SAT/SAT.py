@@ -15,10 +15,9 @@
 import logging
 from typing import TypedDict, Union
 from time import time
-import nnf
-from nnf import Var, And, Or
-from nnf.dimacs import dump
+from nnf import Var
 import numpy as np
+from pysat.solvers import Solver
 
 from applications.Application import *
 from applications.SAT.mappings.Direct import Direct
@@ -27,6 +26,7 @@ from applications.SAT.mappings.ChoiQUBO import ChoiQubo
 from applications.SAT.mappings.DinneenQUBO import DinneenQubo
 from applications.SAT.mappings.ChoiISING import ChoiIsing
 from applications.SAT.mappings.DinneenISING import DinneenIsing
+from applications.SAT.SATProblem import SATProblem
 
 
 class SAT(Application):
@@ -142,18 +142,19 @@ class SAT(Application):
         problem_set: int
         max_tries: int
 
-    def generate_problem(self, config: Config, iter_count: int) -> (nnf.And, list):
+    def generate_problem(self, config: Config, iter_count: int) -> SATProblem:
         """
         Generates a vehicle configuration problem out of a given config. Returns buildability constraints (hard
         constraints) and tests (soft constraints), the successful evaluation of which we try to maximize. Both
-        are given in nnf form, which we then convert accordingly.
+        are given as arrays of signed literal indices, which are converted to nnf form if a mapping needs them.
 
         :param config: config with the parameters specified in Config class
         :type config: Config
         :param iter_count: the iteration count
         :type iter_count: int
-        :return:
-        :rtype: tuple(nnf.And, list)
+        :return: the SAT instance, which can be unpacked into the hard constraints as nnf.And and the soft constraints
+                 as list of nnf.Or
+        :rtype: SATProblem
         """
 
         self.num_variables = config['variables']
@@ -172,27 +173,15 @@ class SAT(Application):
                 # for the hard and soft constraints, respectively (since rseed of the hard and soft constraints differs
                 # by 1).
                 rng = np.random.default_rng(rseed + attempt * 2)
-                clause_list = []
-                # generate literal list to sample from
-                lit_vars = [Var(f'L{i}') for i in range(nr_vars)]
-                for _ in range(nr_clauses):
-                    # we select three (non-repeated) literals and negate them randomly -- together constituting a clause
-                    chosen_literals = rng.choice(lit_vars, 3, replace=False)
-                    negate_literals = rng.choice([True, False], 3, replace=True)
-                    clause = []
-                    # we perform the random negations and append to clause:
-                    for lit, neg in zip(chosen_literals, negate_literals):
-                        if neg:
-                            clause.append(lit.negate())
-                        else:
-                            clause.append(lit)
-                    # append the generated clause to the total container
-                    clause_list.append(Or(clause))
-                # we generate the conjunction of the problem, such that we can use the nnf native function and test its
-                # satisfiability.
-                prob = And(clause_list)
-
-                if satisfiable and not prob.satisfiable():
+                clauses = np.empty((nr_clauses, 3), dtype=np.int32)
+                for clause in clauses:
+                    # we select three (non-repeated) variables and negate them randomly -- together constituting a
+                    # clause. The random numbers are drawn clause by clause, so that the instances of a problem set
+                    # stay the same.
+                    clause[:] = rng.choice(nr_vars, 3, replace=False) + 1
+                    clause[rng.choice(2, 3) == 0] *= -1
+
+                if satisfiable and not self._is_satisfiable(clauses):
                     if attempt == nr_tries - 1:
                         logging.error("Unable to generate valid solutions. Consider increasing max_tries or decreasing "
                                       "the clause:variable ratio.")
@@ -200,22 +189,26 @@ class SAT(Application):
                     else:
                         continue
                 else:
-                    return clause_list
+                    return clauses
 
         # we choose a random seed -- since we try at most max_tries times to generate a solvable instance,
         # we space the initial random seeds by 2 * max_tries (because we need both hard and soft constraints).
         random_seed = 2 * config['problem_set'] * max_tries
         # generate hard  & soft constraints. We make both satisfiable, but this can in principle be tuned.
-        hard = And(_generate_3sat_clauses(num_constraints, self.num_variables,
-                                          satisfiable=True, rseed=random_seed, nr_tries=max_tries))
+        hard = _generate_3sat_clauses(num_constraints, self.num_variables, satisfiable=True, rseed=random_seed,
+                                      nr_tries=max_tries)
         # the random_seed + 1 ensures that a different set of seeds is sampled compared to the hard constraints.
         soft = _generate_3sat_clauses(num_tests, self.num_variables, satisfiable=True, rseed=random_seed + 1,
                                       nr_tries=config['max_tries'])
         if (hard is None) or (soft is None):
             raise ValueError("Unable to generate satisfiable")
-        # saving constraints and tests
-        self.application['constraints'] = hard
-        self.application['tests'] = soft
+        # the hard constraints are a conjunction, in which duplicate clauses (with the same literals) appear only once
+        _, first = np.unique(np.sort(hard, axis=1), axis=0, return_index=True)
+        hard = hard[np.sort(first)]
+        problem = SATProblem(self.num_variables, hard, soft)
+        # saving the clauses of the constraints and tests as arrays of signed literal indices
+        self.application['constraint_clauses'] = hard
+        self.application['test_clauses'] = soft
         # and their cardinalities:
         self.num_constraints = len(hard)
         self.num_tests = len(soft)
@@ -223,14 +216,27 @@ class SAT(Application):
         logging.info(f'Generated a vehicle options Max3SAT'
                      f' instance with {self.num_variables} variables, {self.num_constraints} constraints'
                      f' and {self.num_tests} tests')
-        return hard, soft
+        return problem
+
+    @staticmethod
+    def _is_satisfiable(clauses: np.ndarray) -> bool:
+        """
+        Checks whether a conjunction of clauses is satisfiable with a CDCL solver.
+
+        :param clauses: array of signed literal indices of shape (number of clauses, 3)
+        :type clauses: np.ndarray
+        :return: whether the clauses are satisfiable
+        :rtype: bool
+        """
+        with Solver(name="glucose3", bootstrap_with=clauses.tolist()) as solver:
+            return solver.solve()
 
     def validate(self, solution: dict) -> (bool, float):
         """
         Checks given solution.
 
         :param solution:
-        :type solution: dict
+        :type solution: dict|np.ndarray
         :return: Boolean whether the solution is valid, time it took to validate
         :rtype: tuple(bool, float)
         """
@@ -238,9 +244,8 @@ class SAT(Application):
 
         logging.info("Checking validity of solution:")
         # logging.info(solution)
-        nr_satisfied_hardcons = len(*np.where(
-            [c.satisfied_by(solution) for c in self.application['constraints'].children]
-        ))
+        nr_satisfied_hardcons = int(np.count_nonzero(self._get_satisfied_clauses(
+            self.application['constraint_clauses'], self._get_assignment_matrix([solution]))))
         ratio = nr_satisfied_hardcons / self.num_constraints
         is_valid = ratio == 1.0
         # prints the ratio of satisfied constraints and prints if all constraints are satisfied
@@ -252,7 +257,7 @@ class SAT(Application):
         Calculates the quality of the solution.
 
         :param solution:
-        :type solution: dict
+        :type solution: dict|np.ndarray
         :return: Tour length, time it took to calculate the tour length
         :rtype: tuple(float, float)
         """
@@ -262,21 +267,108 @@ class SAT(Application):
         # logging.info(solution)
 
         # count the number of satisfied clauses
-        nr_satisfied_tests = len(*np.where([test.satisfied_by(solution) for test in self.application['tests']]))
+        nr_satisfied_tests = int(np.count_nonzero(self._get_satisfied_clauses(
+            self.application['test_clauses'], self._get_assignment_matrix([solution]))))
 
         ratio_satisfied = nr_satisfied_tests / self.num_tests
         logging.info(f"Ratio of satisfied test clauses: {ratio_satisfied}.")
 
         return ratio_satisfied, round(time() * 1000 - start, 3)
 
+    def is_maximization(self) -> bool:
+        return True
+
+    def _get_assignment_matrix(self, solutions: list) -> np.ndarray:
+        """
+        Converts a batch of solutions, which are dicts with the variable names as keys or boolean arrays with the
+        assignment of every variable, into an assignment matrix. Variables which do not appear in any clause may be
+        missing in the dict solutions.
+
+        :param solutions: list of solutions
+        :type solutions: list
+        :return: boolean array of shape (number of solutions, number of variables)
+        :rtype: np.ndarray
+        """
+        # missing variables are marked with -1
+        values = np.array([solution.astype(np.int8) if isinstance(solution, np.ndarray) else
+                           [int(solution.get(str(literal), -1)) for literal in self.literals] for solution in solutions],
+                          dtype=np.int8).reshape(len(solutions), self.num_variables)
+        missing = (values == -1).any(axis=0)
+        if missing.any():
+            used = np.zeros(self.num_variables, dtype=bool)
+            for clauses in (self.application['constraint_clauses'], self.application['test_clauses']):
+                used[np.abs(clauses).ravel() - 1] = True
+            if (missing & used).any():
+                raise ValueError(f"Solution does not contain variable "
+                                 f"'{self.literals[np.flatnonzero(missing & used)[0]]}'")
+        return values == 1
+
+    @staticmethod
+    def _get_satisfied_clauses(clauses: np.ndarray, assignments: np.ndarray) -> np.ndarray:
+        """
+        Checks which clauses are satisfied by a batch of assignments.
+
+        :param clauses: array of signed literal indices of shape (number of clauses, 3)
+        :type clauses: np.ndarray
+        :param assignments: assignment matrix of shape (number of solutions, number of variables)
+        :type assignments: np.ndarray
+        :return: boolean array of shape (number of solutions, number of clauses)
+        :rtype: np.ndarray
+        """
+        satisfied_literals = assignments[:, np.abs(clauses) - 1] == (clauses > 0)
+        return satisfied_literals.any(axis=2)
+
+    def validate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Checks which solutions of a batch satisfy all constraints.
+
+        :param solutions: list of solutions
+        :type solutions: list
+        :return: boolean array whether the solutions are valid and the time it took to validate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        validity = np.zeros(len(solutions), dtype=bool)
+        indices = [idx for idx, solution in enumerate(solutions) if solution is not None]
+        if indices:
+            assignments = self._get_assignment_matrix([solutions[idx] for idx in indices])
+            validity[indices] = self._get_satisfied_clauses(self.application['constraint_clauses'],
+                                                            assignments).all(axis=1)
+        return validity, round(time() * 1000 - start, 3)
+
+    def evaluate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Calculates the ratio of satisfied tests of a batch of solutions.
+
+        :param solutions: list of solutions
+        :type solutions: list
+        :return: array with the ratio of satisfied tests of every solution and the time it took to calculate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        if not solutions:
+            return np.empty(0), round(time() * 1000 - start, 3)
+        assignments = self._get_assignment_matrix(solutions)
+        nr_satisfied_tests = self._get_satisfied_clauses(self.application['test_clauses'], assignments).sum(axis=1)
+        return nr_satisfied_tests / self.num_tests, round(time() * 1000 - start, 3)
+
     def save(self, path: str, iter_count: int) -> None:
+        # the clauses are written in the DIMACS SAT format, like nnf.dimacs.dump does for the nnf form
         with open(f"{path}/constraints.cnf", 'w') as f_cons:
-            dump(
-                obj=self.application['constraints'], fp=f_cons,
-                var_labels={str(literal): idx + 1 for idx, literal in enumerate(self.literals)}
-            )
+            f_cons.write(self._format_dimacs_sat(self.application['constraint_clauses'], '*'))
         with open(f"{path}/tests.cnf", 'w') as f_test:
-            dump(
-                obj=Or(self.application['tests']), fp=f_test,
-                var_labels={str(literal): idx + 1 for idx, literal in enumerate(self.literals)}
-            )
+            f_test.write(self._format_dimacs_sat(self.application['test_clauses'], '+'))
+
+    def _format_dimacs_sat(self, clauses: np.ndarray, operator: str) -> str:
+        """
+        Formats the conjunction ('*') or disjunction ('+') of clauses in the DIMACS SAT format.
+
+        :param clauses: array of signed literal indices of shape (number of clauses, 3)
+        :type clauses: np.ndarray
+        :param operator: '*' for a conjunction, '+' for a disjunction
+        :type operator: str
+        :return: the formula in the DIMACS SAT format
+        :rtype: str
+        """
+        clause_strings = ' '.join(f"+({' '.join(map(str, clause))})" for clause in clauses.tolist())
+        return f"p sat {self.num_variables}\n({operator}({clause_strings}))"
@@ -0,0 +1,98 @@
+#  Copyright 2021 The QUARK Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+from nnf import And, Or, Var
+
+
+class SATProblem:
+    """
+    Max3SAT instance of the vehicle options problem. The hard constraints (buildability constraints) and the soft
+    constraints (tests) are stored as int32 arrays of shape (clauses, 3) of signed literal indices. As in DIMACS, the
+    variable L{i} has the index i + 1, which is negative if the literal is negated.
+
+    The nnf representation used by some of the mappings is only built when it is accessed. For these mappings, the
+    instance can be unpacked into the hard constraints as nnf.And and the soft constraints as list of nnf.Or, i.e.
+    hard, soft = problem.
+    """
+
+    def __init__(self, num_variables: int, constraint_clauses: np.ndarray, test_clauses: np.ndarray):
+        """
+        Constructor method
+
+        :param num_variables: number of variables
+        :type num_variables: int
+        :param constraint_clauses: signed literal indices of the hard constraints
+        :type constraint_clauses: np.ndarray
+        :param test_clauses: signed literal indices of the soft constraints
+        :type test_clauses: np.ndarray
+        """
+        self.num_variables = num_variables
+        self.constraint_clauses = constraint_clauses
+        self.test_clauses = test_clauses
+        self._hard = None
+        self._soft = None
+
+    @staticmethod
+    def clauses_to_nnf(clauses: np.ndarray) -> list:
+        """
+        Converts an array of signed literal indices into a list of nnf clauses.
+
+        :param clauses: signed literal indices of shape (clauses, 3)
+        :type clauses: np.ndarray
+        :return: list of disjunctions of the literals
+        :rtype: list
+        """
+        return [Or([Var(f'L{abs(literal) - 1}', literal > 0) for literal in clause]) for clause in clauses.tolist()]
+
+    @property
+    def hard(self) -> And:
+        """
+        Returns the hard constraints in nnf form.
+
+        :return: conjunction of the hard constraints
+        :rtype: nnf.And
+        """
+        if self._hard is None:
+            self._hard = And(self.clauses_to_nnf(self.constraint_clauses))
+        return self._hard
+
+    @property
+    def soft(self) -> list:
+        """
+        Returns the soft constraints in nnf form.
+
+        :return: list of the soft constraints
+        :rtype: list
+        """
+        if self._soft is None:
+            self._soft = self.clauses_to_nnf(self.test_clauses)
+        return self._soft
+
+    def __iter__(self):
+        return iter((self.hard, self.soft))
+
+    def __getitem__(self, index: int) -> any:
+        return (self.hard, self.soft)[index]
+
+    def __len__(self) -> int:
+        return 2
+
+    def __getstate__(self) -> dict:
+        # The nnf representation is not pickled, so that the fingerprint of the problem does not depend on whether it
+        # was already built
+        state = self.__dict__.copy()
+        state['_hard'] = None
+        state['_soft'] = None
+        return state
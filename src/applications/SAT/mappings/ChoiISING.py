@@ -98,8 +98,8 @@ class ChoiIsing(Mapping):
         q, _ = self.qubo_mapping.map(problem, config)
         t, j, _ = qubo_to_ising(q["Q"])
 
-        # Convert Ising dict to matrix
-        n = (len(problem[0]) + len(problem[1])) * 3
+        # Convert Ising dict to matrix, there is one binary variable per literal occurrence
+        n = len(self.qubo_mapping.reverse_literals)
         t_vector = np.zeros(n, dtype=float)
         j_matrix = np.zeros((n, n), dtype=float)
 
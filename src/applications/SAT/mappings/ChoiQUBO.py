@@ -13,11 +13,13 @@
 #  limitations under the License.
 
 import logging
-from typing import TypedDict
-from nnf import Var, And
+from typing import TypedDict, Union
+import numpy as np
 from applications.Mapping import *
+from applications.SAT.SATProblem import SATProblem
 from solvers.Annealer import Annealer
-from itertools import combinations, product
+from solvers.ParallelTempering import ParallelTempering
+from itertools import combinations
 
 
 class ChoiQubo(Mapping):
@@ -30,9 +32,9 @@ class ChoiQubo(Mapping):
         Constructor method
         """
         super().__init__()
-        self.solver_options = ["Annealer"]
+        self.solver_options = ["Annealer", "ParallelTempering"]
         self.nr_vars = None
-        self.reverse_dict = None
+        self.reverse_literals = None
 
     def get_parameter_options(self) -> dict:
         """
@@ -77,14 +79,18 @@ class ChoiQubo(Mapping):
         hard_reward: float
         soft_reward: float
 
-    def map(self, problem: (And, list), config) -> (dict, float):
+    def map(self, problem: SATProblem, config) -> (dict, float):
         """
         Converts a MaxSAT instance with hard and soft constraints into a graph problem -- solving MaxSAT then
         corresponds to solving an instance of the Maximal Independent Set problem. See Andrew Lucas (2014),
         or the original publication by Choi (1004.2226).
 
-        :param problem:
-        :type problem: (nnf.And, list)
+        Every occurrence of a literal in a clause is a node of the graph. The nodes are ordered by their name, e.g.
+        L12-5 if literal L12 is present in clause nr. 5, so that the binary variables are the same as in the original
+        string based construction.
+
+        :param problem: the SAT problem
+        :type problem: SATProblem
         :param config: config with the parameters specified in Config class
         :type config: Config
         :return:
@@ -92,86 +98,63 @@ class ChoiQubo(Mapping):
         """
         start = time() * 1000
 
-        hard_constraints, soft_constraints = problem
         # in principle, one could use a different value of A -- it shouldn't play a role though.
         A = 1
         Bh = config['hard_reward'] * A
         # we divide Bh by the number of test clauses, such that fulfilling a test result is less favourable than
         # satisfying a constraint, which we aim to prioritize.
-        Bs = Bh * config['soft_reward'] / len(soft_constraints)
-        # we count the number of different variables that appear in the vehicle options problem:
-        self.nr_vars = len(hard_constraints.vars().union(And(soft_constraints).vars()))
-        # edges variable holds all edges in the resulting graph
-        edges = {}
-        # lit_occur is a dictionary which will store the information in which clause a certain literal will occur.
-        lit_occur = {}
-
-        def _add_clause(clause, curr_edges, curr_lit_occ, pos):
-            # iterating through the clauses, we add nodes corresponding to each literal
-            # the format is as follows: L12-5, means that literal 12 is present in clause nr. 5.
-            literals = [f"{el}-{pos}" for el in clause.children]
-            # we connect the literals within one clause
-            for cmb in combinations(literals, 2):
-                # we add a weight for each edge within clause
-                curr_edges[cmb] = A
-            # we add the occurrences of the variables to the occurrences dictionary
-            for var in clause.children:
-                if var.name not in curr_lit_occ.keys():
-                    curr_lit_occ[var.name] = {True: [], False: []}
-                # we add occurrences and mark that they correspond to hard constraints
-                curr_lit_occ[var.name][var.true].append(pos)
-            return curr_edges, curr_lit_occ
-
-        # first convert the hard constraints into the graph
-        for idx, hard_constraint in enumerate(hard_constraints):
-            edges, lit_occur = _add_clause(hard_constraint, edges, lit_occur, idx)
-
-        # we save the current total clause count:
-        constraints_max_ind = len(hard_constraints)
-        # we repeat the procedure for the soft constraints:
-        for idx, soft_constraint in enumerate(soft_constraints):
-            edges, lit_occur = _add_clause(soft_constraint, edges, lit_occur, idx + constraints_max_ind)
-
-        # we connect conflicting clauses using the lit_occur dict:
-        for literal, positions_dict in lit_occur.items():
-            # for every literal lit, we check its occurrences and connect the non-negated and negated occurrences.
-            for pos_true, pos_false in product(positions_dict[True], positions_dict[False]):
-                # we ensure that we do not add a penalty for contradicting literals in the
-                if pos_true != pos_false:
-                    # we employ the notation from nnf, where the tilde symbol ~ corresponds to negation.
-                    lit_true, lit_false = f"{literal}-{pos_true}", f"~{literal}-{pos_false}"
-                    # we add a penalty for each such edge:
-                    edges[(lit_true, lit_false)] = A
-
-        # we collect all different nodes that we have in our graph, omitting repetitions:
-        node_set = set([])
-        for nodes in edges.keys():
-            node_set = node_set.union(set(nodes))
-
-        node_list = sorted(node_set)
-        # we fix a mapping (node -> binary variable)
-        relabel_dict = {v: i for i, v in enumerate(node_list)}
-        # we save the reverse mapping, which is later used to decode the solution.
-        self.reverse_dict = {i: v for i, v in enumerate(node_list)}
-
-        def _remap_pair(pair):
-            """Small helper function that maps the nodes of an edge to binary variables"""
-            return relabel_dict[pair[0]], relabel_dict[pair[1]]
+        Bs = Bh * config['soft_reward'] / len(problem.test_clauses)
+        self.nr_vars = problem.num_variables
+
+        # the hard constraints are followed by the soft constraints, every occurrence of a literal gets the id
+        # 3 * clause + position in the clause
+        clauses = np.concatenate([problem.constraint_clauses, problem.test_clauses])
+        literals = clauses.ravel()
+        positions = np.repeat(np.arange(len(clauses)), clauses.shape[1])
+        occurrences = np.arange(len(literals)).reshape(clauses.shape)
+
+        # we connect the literals within one clause
+        pairs = np.array(list(combinations(range(clauses.shape[1]), 2)))
+        intra_u = occurrences[:, pairs[:, 0]].ravel()
+        intra_v = occurrences[:, pairs[:, 1]].ravel()
+
+        # we connect every non-negated occurrence of a variable with every negated occurrence in another clause.
+        # For this, the occurrences are grouped by variable and every non-negated occurrence is repeated once for
+        # every negated occurrence of its variable.
+        variables = np.abs(literals) - 1
+        true_occ = np.flatnonzero(literals > 0)
+        true_occ = true_occ[np.argsort(variables[true_occ], kind="stable")]
+        false_occ = np.flatnonzero(literals < 0)
+        false_occ = false_occ[np.argsort(variables[false_occ], kind="stable")]
+        false_count = np.bincount(variables[false_occ], minlength=self.nr_vars)
+        false_start = np.cumsum(false_count) - false_count
+        repeats = false_count[variables[true_occ]]
+        conflict_u = np.repeat(true_occ, repeats)
+        offsets = np.arange(len(conflict_u)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        conflict_v = false_occ[np.repeat(false_start[variables[true_occ]], repeats) + offsets]
+        different_clause = positions[conflict_u] != positions[conflict_v]
+        conflict_u, conflict_v = conflict_u[different_clause], conflict_v[different_clause]
+
+        # we fix a mapping (node -> binary variable) by sorting the names of the nodes, e.g. L12-5 and ~L12-7
+        names = np.char.add(np.char.add(np.where(literals > 0, "L", "~L"), variables.astype(str)),
+                            np.char.add("-", positions.astype(str)))
+        node_order = np.argsort(names, kind="stable")
+        relabel = np.empty_like(node_order)
+        relabel[node_order] = np.arange(len(node_order))
+        # we save the reverse mapping (binary variable -> literal), which is later used to decode the solution.
+        self.reverse_literals = literals[node_order]
 
         # we save the Qubo corresponding to the graph.
-        Q = {_remap_pair(key): val for key, val in edges.items()}
-
-        for v in node_list:
-            # we add different energy rewards depending on whether it is a hard or a soft constraint
-            # soft cons. have lower rewards, since we prioritize satisfying hard constraints.
-            if int(v.split('-')[-1]) < constraints_max_ind:
-                # if hard cons, we add -Bh as the reward
-                Q[_remap_pair((v, v))] = -Bh
-            else:
-                # for soft constraints we add -Bs
-                Q[_remap_pair((v, v))] = -Bs
-
-        logging.info(f"Converted to Choi Qubo with {len(node_list)} binary variables. Bh={config['hard_reward']},"
+        rows = relabel[np.concatenate([intra_u, conflict_u])].tolist()
+        cols = relabel[np.concatenate([intra_v, conflict_v])].tolist()
+        Q = dict.fromkeys(zip(rows, cols), A)
+        # we add different energy rewards depending on whether it is a hard or a soft constraint
+        # soft cons. have lower rewards, since we prioritize satisfying hard constraints.
+        hard = positions[node_order] < len(problem.constraint_clauses)
+        for v, is_hard in enumerate(hard.tolist()):
+            Q[(v, v)] = -Bh if is_hard else -Bs
+
+        logging.info(f"Converted to Choi Qubo with {len(node_order)} binary variables. Bh={config['hard_reward']},"
                      f" Bs={Bs}.")
         return {'Q': Q}, round(time() * 1000 - start, 3)
 
@@ -185,50 +168,22 @@ class ChoiQubo(Mapping):
         :rtype: tuple(dict, float)
         """
         start = time() * 1000
-        # we define the literals list, so that we can check the self-consistency of the solution. That is, we save all
-        # assignments proposed by the annealer, and see if there is no contradiction. (In principle a solver
-        # could mandate L3 = True and L3 = False, resulting in a contradiction.)
-        literals = []
-        # assignments saves the actual solution
-        assignments = []
-        for node, tf in solution.items():
-            # we check if node is included in the set (i.e. if tf is True (1))
-            if tf:
-                # convert back to the language of literals
-                lit_str = self.reverse_dict[node]
-                # we check if the literal is negated:
-                if lit_str.startswith('~'):
-                    # remove the negation symbol
-                    lit_str = lit_str.replace('~', '')
-                    # save a negated literal object, will be used for self-consistency check
-                    lit = Var(lit_str).negate()
-                    # add the negated literal to the assignments, removing the (irrelevant) position part
-                    assignments.append(Var(lit_str.split('-')[0]).negate())
-                else:
-                    # if literal is true, no ~ symbol needs to be removed:
-                    lit = Var(lit_str)
-                    assignments.append(Var(lit_str.split('-')[0]))
-                literals.append(lit)
-        # we check for self-consistency of solution; we check that the assignments of all literals are consistent:
-        if not And(set(literals)).satisfiable():
-            logging.error('Generated solution is not self-consistent!')
-            raise ValueError("Inconsistent solution for the ChoiQubo returned.")
-        else:
-            # If the solution is consistent, we have to find and add potentially missing variables:
-            assignments = sorted(set(assignments))
-            # find missing vars, or more precisely, their labels:
-            missing_vars = set(range(self.nr_vars)) - set(
-                [int(str(a).replace('L', '').replace('~', '')) for a in assignments]
-            )
-            # add the variables that we found were missing:
-            for nr in missing_vars:
-                assignments.append(Var(f'L{nr}'))
+        # the literals of the nodes which are included in the set (i.e. if tf is True (1))
+        selected = np.array([node for node, tf in solution.items() if tf], dtype=int)
+        literals = self.reverse_literals[selected]
+        # a solver could mandate L3 = True in one clause and L3 = False in another one, which is penalized by the
+        # conflict edges. In this case, as well as for variables without any selected literal, the variable is set to
+        # False if a negated literal is selected and to True otherwise.
+        assignments = np.ones(self.nr_vars, dtype=bool)
+        assignments[np.abs(literals[literals < 0]) - 1] = False
 
-        return {list(v.vars())[0]: v.true for v in sorted(assignments)}, round(time() * 1000 - start, 3)
+        return {f'L{i}': value for i, value in enumerate(assignments.tolist())}, round(time() * 1000 - start, 3)
 
-    def get_solver(self, solver_option: str) -> Annealer:
+    def get_solver(self, solver_option: str) -> Union[Annealer, ParallelTempering]:
 
         if solver_option == "Annealer":
             return Annealer()
+        elif solver_option == "ParallelTempering":
+            return ParallelTempering()
         else:
             raise NotImplementedError(f"Solver Option {solver_option} not implemented")
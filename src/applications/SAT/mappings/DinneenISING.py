@@ -17,7 +17,6 @@ from typing import TypedDict, Union
 import numpy as np
 from dimod import qubo_to_ising
 
-from nnf import And
 from applications.SAT.mappings.DinneenQUBO import DinneenQubo
 from solvers.PennylaneQAOA import PennylaneQAOA
 from solvers.QAOA import QAOA
@@ -91,7 +90,7 @@ class DinneenIsing(Mapping):
         t, j, _ = qubo_to_ising(q["Q"])
 
         # Convert Ising dict to matrix
-        n = (len(problem[0]) + len(problem[1])) + len(problem[0].vars().union(And(problem[1]).vars()))
+        n = len(problem.constraint_clauses) + len(problem.test_clauses) + self.qubo_mapping.nr_vars
         t_vector = np.zeros(n, dtype=float)
         j_matrix = np.zeros((n, n), dtype=float)
 
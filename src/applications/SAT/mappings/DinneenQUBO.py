@@ -13,10 +13,13 @@
 #  limitations under the License.
 
 import logging
-from typing import TypedDict
-from nnf import And
+from typing import TypedDict, Union
+import numpy as np
+from scipy.sparse import coo_matrix
 from applications.Mapping import *
+from applications.SAT.SATProblem import SATProblem
 from solvers.Annealer import Annealer
+from solvers.ParallelTempering import ParallelTempering
 from itertools import combinations
 
 
@@ -30,7 +33,7 @@ class DinneenQubo(Mapping):
         Constructor method
         """
         super().__init__()
-        self.solver_options = ["Annealer"]
+        self.solver_options = ["Annealer", "ParallelTempering"]
         self.nr_vars = None
 
     def get_parameter_options(self) -> dict:
@@ -66,86 +69,67 @@ class DinneenQubo(Mapping):
         """
         lagrange: float
 
-    def map(self, problem: (And, list), config: Config) -> (dict, float):
+    def map(self, problem: SATProblem, config: Config) -> (dict, float):
         """
         Performs the mapping into a QUBO formulation, as given by Dinneen. See also the QUARK paper.
-        
-        :param problem: 
-        :type problem: any
+
+        Every clause with the signs s_i of its literals x_i, the weight w and the auxiliary variable a contributes the
+        terms 2w a, -w s_i x_i, -w s_i x_i a and w s_i s_j x_i x_j. The terms of all clauses are generated at once and
+        the duplicates are summed up in the sparse matrix.
+
+        :param problem: the SAT problem
+        :type problem: SATProblem
         :param config: config with the parameters specified in Config class
         :type config: Config
         :return: dict with the QUBO, time it took to map it
         :rtype: tuple(dict, float)
-        """""
+        """
         start = time() * 1000
-        # extract hard and soft constraints from the generated problem
-        hard, soft = problem
-        # count the variables
-        self.nr_vars = len(hard.vars().union(And(soft).vars()))
+        self.nr_vars = problem.num_variables
         lagrange = config['lagrange']
         # lagrange parameter is a factor of the number of soft constraints.
-        lagrange *= len(soft)
-
-        def _add_clause(curr_qubo_dict, clause, pos, weight):
-            """
-            Function that adds the QUBO terms corresponding to the clause and updates the QUBO dictionary
-             accordingly. Additionally, the weight of the clause is taken into account.
-
-            :param curr_qubo_dict:
-            :param clause:
-            :param pos:
-            :param weight:
-            :return:
-            """
-
-            def _check_and_add(dictionary, key, value):
-                """
-                Helper function that checks if key is present or not in dictionary and adds a value, adding the key
-                if missing.
-
-                :param dictionary:
-                :param key:
-                :param value:
-                :return:
-                """
-                key = tuple(sorted(key))
-                if key not in dictionary.keys():
-                    dictionary[key] = value
-                else:
-                    dictionary[key] += value
-                return dictionary
-
-            cl_dict = {}
-            for variable in clause.children:
-                for variable_name in variable.vars():
-                    # transforms the negations (0,1) into signs (-1, 1)
-                    cl_dict[int(variable_name[1:])] = (int(variable.true) - 1 / 2) * 2
-
-            # add the linear term of the auxiliary variable w
-            curr_qubo_dict = _check_and_add(curr_qubo_dict, (pos, pos), 2 * weight)
-
-            # add x linear terms and xw terms.
-            for qvar, val in cl_dict.items():
-                # qvar is the name of the var, val is the sign corresponding to whether the variable is negated or not.
-                # linear x term:
-                curr_qubo_dict = _check_and_add(curr_qubo_dict, (qvar, qvar), -weight * val)
-                # x * w (aux. var.) term
-                curr_qubo_dict = _check_and_add(curr_qubo_dict, (qvar, pos), -weight * val)
-            # add combinations
-            for q1, q2 in combinations(cl_dict.keys(), 2):
-                curr_qubo_dict = _check_and_add(curr_qubo_dict, (q1, q2), weight * cl_dict[q1] * cl_dict[q2])
-
-            return curr_qubo_dict
-
-        qubo_dict = {}
-        # first we add the hard constraints -- we add the lagrange parameter as weight
-        for clause_ind, hard_clause in enumerate(hard):
-            qubo_dict = _add_clause(qubo_dict, hard_clause, self.nr_vars + clause_ind, lagrange)
-        # next, we add the soft constraints -- we start the enumeration at the final index corresponding to hard cons.
-        for clause_ind, soft_clause in enumerate(soft):
-            qubo_dict = _add_clause(qubo_dict, soft_clause, self.nr_vars + clause_ind + len(hard), 1)
-
-        logging.info(f"Generate Dinneen QUBO with {self.nr_vars + len(hard) + len(soft)} binary variables."
+        lagrange *= len(problem.test_clauses)
+
+        # the hard constraints get the lagrange parameter as weight and come first, so that the auxiliary variables of
+        # the soft constraints start at the final index corresponding to hard cons.
+        clauses = np.concatenate([problem.constraint_clauses, problem.test_clauses])
+        weights = np.concatenate([np.full(len(problem.constraint_clauses), lagrange, dtype=float),
+                                  np.ones(len(problem.test_clauses))])
+        variables = np.abs(clauses) - 1
+        # transforms the negations into signs (-1, 1)
+        signs = np.sign(clauses).astype(float)
+        aux = self.nr_vars + np.arange(len(clauses))
+        pairs = np.array(list(combinations(range(clauses.shape[1]), 2)))
+
+        rows = np.concatenate([
+            # linear term of the auxiliary variable w
+            aux,
+            # x linear terms and xw terms
+            variables.ravel(),
+            variables.ravel(),
+            # combinations
+            variables[:, pairs[:, 0]].ravel()
+        ])
+        cols = np.concatenate([
+            aux,
+            variables.ravel(),
+            np.repeat(aux, clauses.shape[1]),
+            variables[:, pairs[:, 1]].ravel()
+        ])
+        values = np.concatenate([
+            2 * weights,
+            (-weights[:, np.newaxis] * signs).ravel(),
+            (-weights[:, np.newaxis] * signs).ravel(),
+            (weights[:, np.newaxis] * signs[:, pairs[:, 0]] * signs[:, pairs[:, 1]]).ravel()
+        ])
+
+        # the keys are sorted pairs, so that all terms of a pair end up in the upper triangle
+        size = self.nr_vars + len(clauses)
+        qubo = coo_matrix((values, (np.minimum(rows, cols), np.maximum(rows, cols))), shape=(size, size))
+        qubo.sum_duplicates()
+        qubo_dict = dict(zip(zip(qubo.row.tolist(), qubo.col.tolist()), qubo.data.tolist()))
+
+        logging.info(f"Generate Dinneen QUBO with {size} binary variables."
                      f" Lagrange parameter used was: {config['lagrange']}.")
         return {"Q": qubo_dict}, round(time() * 1000 - start, 3)
 
@@ -168,9 +152,11 @@ class DinneenQubo(Mapping):
                 mapped_sol[f'L{i}'] = bool(solution[i])
         return mapped_sol, round(time() * 1000 - start, 3)
 
-    def get_solver(self, solver_option: str) -> Annealer:
+    def get_solver(self, solver_option: str) -> Union[Annealer, ParallelTempering]:
 
         if solver_option == "Annealer":
             return Annealer()
+        elif solver_option == "ParallelTempering":
+            return ParallelTempering()
         else:
             raise NotImplementedError(f"Solver Option {solver_option} not implemented")
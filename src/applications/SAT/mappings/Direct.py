@@ -17,15 +17,14 @@ from typing import TypedDict, Union
 from applications.Mapping import *
 from solvers.ClassicalSAT import ClassicalSAT
 from solvers.RandomClassicalSAT import RandomSAT
-import io
-from nnf import And
-from nnf.dimacs import dump
-from pysat.formula import CNF, WCNF
+import numpy as np
+from pysat.formula import WCNF
+from applications.SAT.SATProblem import SATProblem
 
 
 class Direct(Mapping):
     """
-    Maps the problem from nnf to pysat.
+    Maps the problem from the clause arrays to pysat.
     """
 
     def __init__(self):
@@ -34,6 +33,7 @@ class Direct(Mapping):
         """
         super().__init__()
         self.solver_options = ["ClassicalSAT", "RandomSAT"]
+        self.nr_vars = None
 
     def get_parameter_options(self):
         """
@@ -52,42 +52,26 @@ class Direct(Mapping):
         """
         pass
 
-    def map(self, problem: (And, list), config: Config) -> (WCNF, float):
+    def map(self, problem: SATProblem, config: Config) -> (WCNF, float):
         """
-        We map from the nnf library into the python-sat library.
+        We map the clause arrays of the SAT problem into the python-sat library. The signed literal indices are the
+        same as the variables of pysat, so the clauses can be added directly.
 
-        :param problem:
-        :type problem: (nnf.And, list)
+        :param problem: the SAT problem
+        :type problem: SATProblem
         :param config: empty dict
         :type config: Config
         :return: mapped problem and the time it took to map it
         :rtype: tuple(WCNF, float)
         """
         start = time() * 1000
-        hard_constraints, soft_constraints = problem
-        # get number of vars. The union is required in case not all vars are present in either tests/constraints.
-        nr_vars = len(hard_constraints.vars().union(And(soft_constraints).vars()))
-        # create a var_labels dictionary that will be used when mapping to pysat
-        litdic = {f'L{i - 1}': i for i in range(1, nr_vars + 1)}
-        # The most convenient way to map between nnf and pysat was to use the native nnf dump function, which exports
-        # the problem as a string, which we can then quickly reload from a buffer.
-        # create buffers for dumping:
-        hard_buffer = io.StringIO()
-        soft_buffer = io.StringIO()
-        # dump constraints and tests to their respective buffers
-        dump(hard_constraints, hard_buffer, var_labels=litdic, mode='cnf')
-        # tests have to be conjoined, since we will add them as soft constraints.
-        dump(And(soft_constraints), soft_buffer, var_labels=litdic, mode='cnf')
-
-        # load the cnfs from the buffers:
-        hard_cnf = CNF(from_string=hard_buffer.getvalue())
-        soft_cnf = CNF(from_string=soft_buffer.getvalue())
+        self.nr_vars = problem.num_variables
         # create wcnf instance.
         total_wcnf = WCNF()
         # add hard constraints:
-        total_wcnf.extend(hard_cnf)
+        total_wcnf.extend(problem.constraint_clauses.tolist())
         # add soft constraints, with weights.
-        total_wcnf.extend(soft_cnf, weights=[1] * len(soft_cnf.clauses))
+        total_wcnf.extend(problem.test_clauses.tolist(), weights=[1] * len(problem.test_clauses))
         logging.info(f'Generated pysat wcnf with {len(total_wcnf.hard)} constraints and {len(total_wcnf.soft)} tests.')
         return total_wcnf, round(time() * 1000 - start, 3)
 
@@ -100,17 +84,20 @@ class Direct(Mapping):
         else:
             raise NotImplementedError(f"Solver Option {solver_option} not implemented")
 
-    def reverse_map(self, solution: list) -> (dict, float):
+    def reverse_map(self, solution: list) -> (np.ndarray, float):
         """
         Maps the solution returned by the pysat solver into the reference format.
 
-        :param solution: dictionary containing the solution
+        :param solution: list of the signed literals of the solution
         :type solution: list
-        :return: solution mapped accordingly, time it took to map it
-        :rtype: tuple(dict, float)
+        :return: assignment of the variables L0, L1, ..., time it took to map it
+        :rtype: tuple(np.ndarray, float)
         """
 
         start = time() * 1000
-        # converts from (3 / -3) -> (L2 : True / L2: False)
-        mapped_sol = {f'L{abs(lit) - 1}': (lit > 0) for lit in solution}
+        # converts from (3 / -3) -> (L2 : True / L2: False). Variables which do not appear in any clause are not part
+        # of the solution, their assignment does not matter.
+        literals = np.asarray(solution, dtype=int)
+        mapped_sol = np.zeros(self.nr_vars, dtype=bool)
+        mapped_sol[np.abs(literals) - 1] = literals > 0
         return mapped_sol, round(time() * 1000 - start, 3)
@@ -13,11 +13,12 @@
 #  limitations under the License.
 
 import logging
-from typing import TypedDict
+from typing import TypedDict, Union
 from qubovert.sat import NOT, OR, AND
 from nnf import And
 from applications.Mapping import *
 from solvers.Annealer import Annealer
+from solvers.ParallelTempering import ParallelTempering
 
 
 class QubovertQubo(Mapping):
@@ -30,7 +31,7 @@ class QubovertQubo(Mapping):
         Constructor method
         """
         super().__init__()
-        self.solver_options = ["Annealer"]
+        self.solver_options = ["Annealer", "ParallelTempering"]
         self.pubo_problem = None
         self.nr_vars = None
 
@@ -172,9 +173,11 @@ class QubovertQubo(Mapping):
             pubo_sol[missing_var] = True
         return pubo_sol, round(time() * 1000 - start, 3)
 
-    def get_solver(self, solver_option: str) -> Annealer:
+    def get_solver(self, solver_option: str) -> Union[Annealer, ParallelTempering]:
 
         if solver_option == "Annealer":
             return Annealer()
+        elif solver_option == "ParallelTempering":
+            return ParallelTempering()
         else:
             raise NotImplementedError(f"Solver Option {solver_option} not implemented")
@@ -14,12 +14,14 @@
 
 import logging
 import os
+from functools import lru_cache
 from typing import TypedDict, Union
 from time import time
 
 import networkx
 import networkx as nx
 import numpy as np
+from scipy.sparse.csgraph import csgraph_from_dense, shortest_path
 
 from applications.Application import *
 from applications.TSP.mappings.Direct import Direct
@@ -99,21 +101,60 @@ class TSP(Application):
     @staticmethod
     def _get_tsp_matrix(graph: networkx.Graph) -> np.ndarray:
         """
-        Creates distance matrix out of given coordinates.
+        Creates the distance matrix of the given graph, which holds the length of the shortest path between every pair
+        of nodes. The nodes are expected to be labeled 1 to n, node i corresponds to row and column i - 1.
 
         :param graph:
         :type graph: networkx.Graph
         :return:
         :rtype: np.ndarray
         """
-        number_of_nodes = len(graph)
-        matrix = np.zeros((number_of_nodes, number_of_nodes))
-        for i in nx.all_pairs_dijkstra_path_length(graph, weight="weight"):
-            distance_dist = i[1]
-            for j in distance_dist.items():
-                matrix[i[0] - 1][j[0] - 1] = j[1]
-                matrix[j[0] - 1][i[0] - 1] = matrix[i[0] - 1][j[0] - 1]
-        return matrix
+        # Non-existing edges are marked as inf, so that edges with weight 0 are kept
+        weights = nx.to_numpy_array(graph, nodelist=sorted(graph.nodes), weight="weight", nonedge=np.inf)
+        return shortest_path(csgraph_from_dense(weights, null_value=np.inf), method="D", directed=False)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _get_reference_graph() -> networkx.Graph:
+        """
+        Reads the reference graph. It is only read once per process, so it must not be modified.
+
+        :return: the reference graph
+        :rtype: networkx.Graph
+        """
+        return nx.read_gpickle(os.path.join(os.path.dirname(__file__), "reference_graph.gpickle"))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _get_reference_tsp_matrix(nodes: int) -> np.ndarray:
+        """
+        Returns the distance matrix of the subgraph of the reference graph containing the given number of nodes. It is
+        only computed once per process and number of nodes, so it must not be modified.
+
+        :param nodes: number of nodes
+        :type nodes: int
+        :return: the distance matrix
+        :rtype: np.ndarray
+        """
+        graph = TSP._get_reference_graph()
+
+        # Remove nodes until the target number of nodes is reached
+        nodes_in_graph = [x for x in graph.nodes]
+        nodes_in_graph.sort()
+
+        if len(nodes_in_graph) < nodes:
+            raise ValueError(f"Too many nodes! The original graph has less seams than that!")
+
+        graph = graph.subgraph(nodes_in_graph[:nodes])
+
+        if not nx.is_connected(graph):
+            logging.error("Graph is not connected!")
+            raise ValueError(f"Graph is not connected!")
+
+        # The shortest paths are computed within the subgraph, they must not use any of the removed nodes
+        cost_matrix = TSP._get_tsp_matrix(graph)
+        cost_matrix.flags.writeable = False
+        return cost_matrix
 
     def generate_problem(self, config: Config, iter_count: int) -> networkx.Graph:
         """
@@ -132,33 +173,59 @@ class TSP(Application):
 
         nodes = config['nodes']
 
-        # Read in the original graph
-        graph = nx.read_gpickle(os.path.join(os.path.dirname(__file__), "reference_graph.gpickle"))
+        # normalize graph, the reference graph and the distance matrices are cached
+        cost_matrix = self._get_reference_tsp_matrix(nodes)
+        graph = nx.from_numpy_array(cost_matrix)
+        # The distance matrix is kept alongside the graph, so that tours can be evaluated without graph lookups
+        graph.graph["cost_matrix"] = cost_matrix
 
-        # Remove seams until the target number of seams is reached
-        # Get number of seam in graph
-        nodes_in_graph = [x for x in graph.nodes]
-        nodes_in_graph.sort()
+        self.application = graph
+        return graph
 
-        if len(nodes_in_graph) < nodes:
-            raise ValueError(f"Too many nodes! The original graph has less seams than that!")
+    def get_assignment_matrices(self, solutions: list) -> np.ndarray:
+        """
+        Converts a batch of solutions, which are dicts with the (node, timestep) pairs as keys, into assignment
+        matrices. The entry [i, node, timestep] of the result holds the value of (node, timestep) in the i-th solution.
 
-        unwanted_nodes = nodes_in_graph[-len(nodes_in_graph) + nodes:]
-        unwanted_nodes = [x for x in graph.nodes if x in unwanted_nodes]
-        # Remove one node after another
-        for node in unwanted_nodes:
-            graph.remove_node(node)
+        :param solutions: list of solutions
+        :type solutions: list
+        :return: array of shape (number of solutions, number of nodes, number of nodes)
+        :rtype: np.ndarray
+        """
+        n = self.application.number_of_nodes()
+        assignments = np.zeros((len(solutions), n, n))
+        for i, solution in enumerate(solutions):
+            if len(solution) == 0:
+                continue
+            nodes, timesteps = np.array(list(solution.keys()), dtype=int).T
+            assignments[i, nodes, timesteps] = np.array(list(solution.values()), dtype=float)
+        return assignments
+
+    def decode_routes(self, solutions: list) -> (np.ndarray, np.ndarray):
+        """
+        Converts a batch of solutions into routes. A solution is valid if every node is visited at exactly one
+        timestep and every timestep has exactly one node flagged. Solutions with empty timesteps are rejected, they
+        are not repaired by filling in the unvisited nodes. The routes are rotated to start at the first node.
+
+        :param solutions: list of solutions, which are dicts with the (node, timestep) pairs as keys
+        :type solutions: list
+        :return: array of shape (number of solutions, number of nodes) containing the routes, boolean array whether
+                 the solutions are valid. The routes of invalid solutions are meaningless.
+        :rtype: tuple(np.ndarray, np.ndarray)
+        """
+        assignments = self.get_assignment_matrices(solutions)
+        n = assignments.shape[1]
 
-        if not nx.is_connected(graph):
-            logging.error("Graph is not connected!")
-            raise ValueError(f"Graph is not connected!")
+        # check whether every timestep has only 1 node flagged and every node is flagged at only 1 timestep
+        valid = np.all(assignments.sum(axis=2) == 1, axis=1) & np.all(assignments.sum(axis=1) == 1, axis=1)
 
-        # normalize graph
-        cost_matrix = self._get_tsp_matrix(graph)
-        graph = nx.from_numpy_array(cost_matrix)
+        # get the node of every timestep, which is unique for valid solutions
+        routes = (assignments != 0).argmax(axis=1)
 
-        self.application = graph
-        return graph
+        # cycle routes to start at the first node
+        shift = np.argmax(routes == 0, axis=1)
+        routes = np.take_along_axis(routes, (shift[:, np.newaxis] + np.arange(n)) % n, axis=1)
+        return routes, valid
 
     def process_solution(self, solution: dict) -> (list, float):
         """
@@ -170,59 +237,36 @@ class TSP(Application):
         :rtype: tuple(list, float)
         """
         start_time = time() * 1000
-        nodes = self.application.nodes()
-        start = np.min(nodes)
-        # fill route with None values
-        route = [None] * len(self.application)
-        # get nodes from sample
-        # NOTE: Prevent duplicate node entries by enforcing only one occurrence per node along route
-        logging.info(str(solution.items()))
-
-        for (node, timestep), val in solution.items():
-            if val:
-                logging.info((node, timestep))
-            if val and (node not in route):
-                route[timestep] = node
-
-        # check whether every timestep has only 1 node flagged
-        for i in nodes:
-            relevant_nodes = []
-            relevant_timesteps = []
-            for (node, timestep) in solution.keys():
-                if node == i:
-                    relevant_nodes.append(solution[(node, timestep)])
-                if timestep == i:
-                    relevant_timesteps.append(solution[(node, timestep)])
-            if sum(relevant_nodes) != 1 or sum(relevant_timesteps) != 1:
-                # timestep or nodes have more than 1 or 0 flags
-                return None, round(time() * 1000 - start_time, 3)
-
-        # check validity of solution
-        if sum(value == 1 for value in solution.values()) > len(route):
-            logging.warning("Result is longer than route! This might be problematic!")
+        routes, valid = self.decode_routes([solution])
+        if not valid[0]:
+            # timestep or nodes have more than 1 or 0 flags
             return None, round(time() * 1000 - start_time, 3)
-
-        # run heuristic replacing None values
-        if None in route:
-            # get not assigned nodes
-            nodes_unassigned = [node for node in list(nodes) if node not in route]
-            nodes_unassigned = list(np.random.permutation(nodes_unassigned))
-            for idx, node in enumerate(route):
-                if node is None:
-                    route[idx] = nodes_unassigned[0]
-                    nodes_unassigned.remove(route[idx])
-
-        # cycle solution to start at provided start location
-        if start is not None and route[0] != start:
-            # rotate to put the start in front
-            idx = route.index(start)
-            route = route[idx:] + route[:idx]
+        route = routes[0].tolist()
 
         # print route
         parsed_route = ' ->\n'.join([f' Node {visit}' for visit in route])
         logging.info(f"Route found:\n{parsed_route}")
         return route, round(time() * 1000 - start_time, 3)
 
+    def process_solutions(self, solutions: list) -> (list, float):
+        """
+        Converts a batch of solutions to lists of visited nodes at once. Invalid solutions are returned as None.
+
+        :param solutions: list of solutions
+        :type solutions: list
+        :return: list of processed solutions and the time it took to process them
+        :rtype: tuple(list, float)
+        """
+        start = time() * 1000
+        processed_solutions = [None] * len(solutions)
+        indices = [idx for idx, solution in enumerate(solutions) if solution is not None]
+        if indices:
+            routes, valid = self.decode_routes([solutions[idx] for idx in indices])
+            for idx, route, is_valid in zip(indices, routes.tolist(), valid):
+                if is_valid:
+                    processed_solutions[idx] = route
+        return processed_solutions, round(time() * 1000 - start, 3)
+
     def validate(self, solution: list) -> (bool, float):
         """
         Checks if it is a valid TSP tour.
@@ -244,6 +288,72 @@ class TSP(Application):
             logging.error(f"{len([node for node in list(nodes) if node not in solution])} nodes were NOT visited")
             return False, round(time() * 1000 - start, 3)
 
+    def get_cost_matrix(self) -> np.ndarray:
+        """
+        Returns the distance matrix stored in the graph attribute 'cost_matrix' by generate_problem. If the graph has
+        no distance matrix, it is created from the edge weights of the graph and stored in the graph.
+
+        :return: the distance matrix, which must not be modified
+        :rtype: np.ndarray
+        """
+        cost_matrix = self.application.graph.get("cost_matrix")
+        if cost_matrix is None or len(cost_matrix) != self.application.number_of_nodes():
+            cost_matrix = nx.to_numpy_array(self.application, nodelist=range(self.application.number_of_nodes()),
+                                             weight="weight")
+            self.application.graph["cost_matrix"] = cost_matrix
+        return cost_matrix
+
+    def get_tour_costs(self, tours: Union[list, np.ndarray]) -> np.ndarray:
+        """
+        Calculates the costs of a batch of tours, including the return from the last to the first node of each tour.
+
+        :param tours: array of shape (number of tours, number of nodes) containing the nodes of each tour
+        :type tours: list|np.ndarray
+        :return: array containing the cost of each tour
+        :rtype: np.ndarray
+        """
+        tours = np.asarray(tours, dtype=int)
+        cost_matrix = self.get_cost_matrix()
+        # Cost without return, followed by the distance between start and end point to complete the cycle
+        return cost_matrix[tours[:, 1:], tours[:, :-1]].sum(axis=1) + cost_matrix[tours[:, 0], tours[:, -1]]
+
+    def validate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Checks which routes of a batch visit all nodes.
+
+        :param solutions: list of routes
+        :type solutions: list
+        :return: boolean array whether the routes are valid and the time it took to validate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        indices = [idx for idx, solution in enumerate(solutions) if solution is not None]
+        if len({len(solutions[idx]) for idx in indices}) > 1:
+            return super().validate_batch(solutions)
+
+        validity = np.zeros(len(solutions), dtype=bool)
+        if indices:
+            routes = np.array([solutions[idx] for idx in indices], dtype=int)
+            visited = np.zeros((len(indices), self.application.number_of_nodes()), dtype=bool)
+            visited[np.arange(len(indices))[:, np.newaxis], routes] = True
+            validity[indices] = visited.all(axis=1)
+        return validity, round(time() * 1000 - start, 3)
+
+    def evaluate_batch(self, solutions: list) -> (np.ndarray, float):
+        """
+        Calculates the costs of a batch of valid routes.
+
+        :param solutions: list of routes
+        :type solutions: list
+        :return: array with the cost of every route and the time it took to calculate them
+        :rtype: tuple(np.ndarray, float)
+        """
+        start = time() * 1000
+        if len({len(solution) for solution in solutions}) > 1:
+            return super().evaluate_batch(solutions)
+        costs = self.get_tour_costs(solutions) if solutions else np.empty(0)
+        return costs, round(time() * 1000 - start, 3)
+
     def evaluate(self, solution: list) -> (float, float):
         """
         Find distance for given route e.g. [0, 4, 3, 1, 2] and original data.
@@ -254,20 +364,7 @@ class TSP(Application):
         :rtype: tuple(float, float)
         """
         start = time() * 1000
-        # get the total distance without return
-        total_dist = 0
-        for idx, node in enumerate(solution[:-1]):
-            dist = self.application[solution[idx + 1]][solution[idx]]
-            total_dist += dist['weight']
-
-        logging.info(f"Total distance (without return): {total_dist}")
-
-        # add distance between start and end point to complete cycle
-        return_distance = self.application[solution[0]][solution[-1]]['weight']
-        # logging.info('Distance between start and end: ' + return_distance)
-
-        # get distance for full cycle
-        distance_with_return = total_dist + return_distance
+        distance_with_return = float(self.get_tour_costs([solution])[0])
         logging.info(f"Total distance (including return): {distance_with_return}")
 
         return distance_with_return, round(time() * 1000 - start, 3)
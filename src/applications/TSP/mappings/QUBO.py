@@ -19,6 +19,7 @@ import networkx
 
 from applications.Mapping import *
 from solvers.Annealer import Annealer
+from solvers.ParallelTempering import ParallelTempering
 
 
 class QUBO(Mapping):
@@ -32,7 +33,7 @@ class QUBO(Mapping):
         Constructor method
         """
         super().__init__()
-        self.solver_options = ["Annealer"]
+        self.solver_options = ["Annealer", "ParallelTempering"]
 
     def get_parameter_options(self) -> dict:
         """
@@ -102,9 +103,11 @@ class QUBO(Mapping):
 
         return {"Q": q}, round(time() * 1000 - start, 3)
 
-    def get_solver(self, solver_option: str) -> Union[Annealer]:
+    def get_solver(self, solver_option: str) -> Union[Annealer, ParallelTempering]:
 
         if solver_option == "Annealer":
             return Annealer()
+        elif solver_option == "ParallelTempering":
+            return ParallelTempering()
         else:
             raise NotImplementedError(f"Solver Option {solver_option} not implemented")
@@ -0,0 +1,231 @@
+#  Copyright 2021 The QUARK Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from time import time
+
+import numpy as np
+
+from devices.Device import Device
+
+
+def get_cost_vector(J: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """
+    Calculates the diagonal of the Ising cost Hamiltonian sum_i t_i Z_i + sum_ij J_ij Z_i Z_j, i.e. the energy of
+    every computational basis state. Wire 0 is the most significant bit of the index of a basis state and the bit b of
+    a wire corresponds to the spin z = 1 - 2b. The diagonal of J only adds a constant, since Z_i Z_i is the identity.
+
+    :param J: J matrix
+    :type J: np.ndarray
+    :param t: t vector
+    :type t: np.ndarray
+    :return: energy of every basis state
+    :rtype: np.ndarray
+    """
+    wires = len(t)
+    z = np.array([1.0, -1.0])
+    cost = np.full(2 ** wires, np.trace(J), dtype=float)
+    for i in np.flatnonzero(t):
+        cost.reshape(2 ** i, 2, -1)[...] += t[i] * z[np.newaxis, :, np.newaxis]
+
+    # the couplings J_ij and J_ji are merged, so that every pair of wires is added only once
+    couplings = np.triu(J + J.T, k=1)
+    zz = np.outer(z, z)[np.newaxis, :, np.newaxis, :, np.newaxis]
+    for i, j in zip(*np.nonzero(couplings)):
+        cost.reshape(2 ** i, 2, 2 ** (j - i - 1), 2, -1)[...] += couplings[i, j] * zz
+    return cost
+
+
+def get_popcounts(wires: int) -> np.ndarray:
+    """
+    Returns the number of set bits of every index of a state vector, which determines the eigenvalue
+    wires - 2 * popcount of the X mixer sum_i X_i in the Hadamard basis.
+
+    :param wires: number of wires
+    :type wires: int
+    :return: number of set bits of every index
+    :rtype: np.ndarray
+    """
+    popcounts = np.zeros(2 ** wires, dtype=np.uint8)
+    for i in range(wires):
+        popcounts.reshape(2 ** i, 2, -1)[:, 1, :] += 1
+    return popcounts
+
+
+def walsh_hadamard(state: np.ndarray) -> np.ndarray:
+    """
+    Applies the unnormalized Walsh-Hadamard transform, i.e. a Hadamard gate on every wire times 2^(wires/2), in place.
+
+    :param state: state vector
+    :type state: np.ndarray
+    :return: the transformed state vector
+    :rtype: np.ndarray
+    """
+    wires = len(state).bit_length() - 1
+    for i in range(wires):
+        pairs = state.reshape(2 ** i, 2, -1)
+        difference = pairs[:, 0, :] - pairs[:, 1, :]
+        pairs[:, 0, :] += pairs[:, 1, :]
+        pairs[:, 1, :] = difference
+    return state
+
+
+class IsingStatevector(Device):
+    """
+    Exact state vector simulator of QAOA circuits for Ising problems. Since the cost Hamiltonian is diagonal, it is
+    precomputed once as vector of the energies of all basis states, so that a cost layer is an elementwise phase. The
+    X mixer is diagonal in the Hadamard basis and applied between two Walsh-Hadamard transforms. The gradient of the
+    expectation value is calculated with the adjoint method in a single backward pass.
+
+    The circuit is the same as the one of PennylaneQAOA: Hadamard gates on all wires followed by layers of the cost
+    layer exp(-i gamma H_C) and the mixer layer exp(i alpha sum_i X_i).
+    """
+
+    def __init__(self):
+        """
+        Constructor method
+        """
+        super().__init__(device_name="ising.statevector")
+        self.device = self
+        self.cost = None
+        self.popcounts = None
+        self.timings = []
+
+    def set_problem(self, J: np.ndarray, t: np.ndarray) -> None:
+        """
+        Precomputes the diagonal of the cost Hamiltonian and of the mixer in the Hadamard basis.
+
+        :param J: J matrix
+        :type J: np.ndarray
+        :param t: t vector
+        :type t: np.ndarray
+        :rtype: None
+        """
+        self.cost = get_cost_vector(np.asarray(J, dtype=float), np.asarray(t, dtype=float))
+        self.popcounts = get_popcounts(len(t))
+        self.timings = []
+
+    def _mixer_phases(self, alpha: float) -> np.ndarray:
+        """
+        Returns the phases of exp(i alpha sum_i X_i) in the Hadamard basis, including the normalization of the two
+        unnormalized Walsh-Hadamard transforms around it.
+
+        :param alpha: mixer angle
+        :type alpha: float
+        :return: phase of every basis state
+        :rtype: np.ndarray
+        """
+        wires = len(self.cost).bit_length() - 1
+        table = np.exp(1j * alpha * (wires - 2 * np.arange(wires + 1))) / 2 ** wires
+        return table[self.popcounts]
+
+    def get_state(self, params: np.ndarray) -> np.ndarray:
+        """
+        Returns the state vector of the QAOA circuit.
+
+        :param params: gammas and alphas of the layers, of shape (2, layers)
+        :type params: np.ndarray
+        :return: state vector
+        :rtype: np.ndarray
+        """
+        state = np.full(len(self.cost), 2 ** (-(len(self.cost).bit_length() - 1) / 2), dtype=complex)
+        for gamma, alpha in zip(*np.asarray(params, dtype=float)):
+            state *= np.exp(-1j * gamma * self.cost)
+            walsh_hadamard(state)
+            state *= self._mixer_phases(alpha)
+            walsh_hadamard(state)
+        return state
+
+    def expval(self, params: np.ndarray) -> float:
+        """
+        Returns the expectation value of the cost Hamiltonian.
+
+        :param params: gammas and alphas of the layers, of shape (2, layers)
+        :type params: np.ndarray
+        :return: expectation value
+        :rtype: float
+        """
+        start = time() * 1000
+        state = self.get_state(params)
+        expval = float(np.dot(self.cost, np.abs(state) ** 2))
+        self.timings.append(round(time() * 1000 - start, 3))
+        return expval
+
+    def expval_and_grad(self, params: np.ndarray) -> (float, np.ndarray):
+        """
+        Returns the expectation value of the cost Hamiltonian and its gradient. The gradient is calculated by running
+        the circuit backwards on the final state and on the cost Hamiltonian applied to it.
+
+        :param params: gammas and alphas of the layers, of shape (2, layers)
+        :type params: np.ndarray
+        :return: expectation value and gradient of the same shape as params
+        :rtype: tuple(float, np.ndarray)
+        """
+        start = time() * 1000
+        params = np.asarray(params, dtype=float)
+        state = self.get_state(params)
+        costate = self.cost * state
+        expval = float(np.real(np.vdot(state, costate)))
+        mixer = len(self.cost).bit_length() - 1 - 2 * self.popcounts.astype(float)
+
+        grad = np.zeros_like(params)
+        for layer in reversed(range(params.shape[1])):
+            gamma, alpha = params[:, layer]
+            walsh_hadamard(state)
+            walsh_hadamard(costate)
+            # d/dalpha of exp(i alpha B) is i B, the factor 2^wires is due to the unnormalized transforms
+            grad[1, layer] = -2 * np.imag(np.vdot(costate, mixer * state)) / len(self.cost)
+            phases = np.conj(self._mixer_phases(alpha))
+            state *= phases
+            costate *= phases
+            walsh_hadamard(state)
+            walsh_hadamard(costate)
+            # d/dgamma of exp(-i gamma C) is -i C
+            grad[0, layer] = 2 * np.imag(np.vdot(costate, self.cost * state))
+            phases = np.exp(1j * gamma * self.cost)
+            state *= phases
+            costate *= phases
+
+        self.timings.append(round(time() * 1000 - start, 3))
+        return expval, grad
+
+    def probs(self, params: np.ndarray) -> np.ndarray:
+        """
+        Returns the probabilities of all basis states.
+
+        :param params: gammas and alphas of the layers, of shape (2, layers)
+        :type params: np.ndarray
+        :return: probability of every basis state
+        :rtype: np.ndarray
+        """
+        start = time() * 1000
+        probs = np.abs(self.get_state(params)) ** 2
+        self.timings.append(round(time() * 1000 - start, 3))
+        return probs
+
+    def sample(self, params: np.ndarray, shots: int) -> np.ndarray:
+        """
+        Samples the final state in the computational basis.
+
+        :param params: gammas and alphas of the layers, of shape (2, layers)
+        :type params: np.ndarray
+        :param shots: number of samples
+        :type shots: int
+        :return: PauliZ eigenvalues of every wire of shape (wires, shots), like the samples of pennylane
+        :rtype: np.ndarray
+        """
+        probs = self.probs(params)
+        indices = np.random.choice(len(probs), size=shots, p=probs / probs.sum())
+        wires = len(probs).bit_length() - 1
+        bits = (indices[np.newaxis, :] >> np.arange(wires - 1, -1, -1)[:, np.newaxis]) & 1
+        return 1 - 2 * bits
@@ -0,0 +1,315 @@
+#  Copyright 2021 The QUARK Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypedDict, Union
+
+import dimod
+import networkx as nx
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix, diags, spmatrix
+
+from devices.Device import Device
+
+
+def qubo_to_csr(Q: Union[dict, spmatrix]) -> (list, np.ndarray, csr_matrix):
+    """
+    Converts a QUBO into its linear terms and a symmetric CSR matrix of the quadratic terms with an empty diagonal, so
+    that the energy of a state x is x @ linear + x @ quadratic @ x / 2.
+
+    :param Q: QUBO as dict keyed by pairs of variables or as square sparse matrix
+    :type Q: dict|spmatrix
+    :return: labels of the variables, linear terms, quadratic terms
+    :rtype: tuple(list, np.ndarray, csr_matrix)
+    """
+    if isinstance(Q, dict):
+        # the variables are labeled in the order of their first appearance, as in dimod
+        labels = list(dict.fromkeys(itertools.chain.from_iterable(Q.keys())))
+        index = {label: i for i, label in enumerate(labels)}
+        rows = np.array([index[u] for u, _ in Q.keys()], dtype=int)
+        cols = np.array([index[v] for _, v in Q.keys()], dtype=int)
+        Q = coo_matrix((np.array(list(Q.values()), dtype=float), (rows, cols)), shape=(len(labels), len(labels)))
+    else:
+        labels = list(range(Q.shape[0]))
+        Q = coo_matrix(Q, dtype=float)
+
+    # duplicate entries are summed up by the conversion to CSR
+    Q = Q.tocsr()
+    linear = Q.diagonal()
+    quadratic = Q + Q.T
+    quadratic = (quadratic - diags(quadratic.diagonal())).tocsr()
+    quadratic.eliminate_zeros()
+    return labels, linear, quadratic
+
+
+def color_variables(quadratic: csr_matrix) -> list:
+    """
+    Colors the interaction graph of the variables, so that variables of the same color do not interact and can be
+    updated at the same time. For every color, the indices of its variables, the indices of the variables they
+    interact with and the matrix of these couplings are returned. The couplings are stored dense, unless they are
+    sparse.
+
+    :param quadratic: symmetric matrix of the quadratic terms
+    :type quadratic: csr_matrix
+    :return: list of the variable indices, neighbor indices and couplings of every color
+    :rtype: list
+    """
+    graph = nx.Graph()
+    graph.add_nodes_from(range(quadratic.shape[0]))
+    graph.add_edges_from(zip(*quadratic.nonzero()))
+    coloring = nx.coloring.greedy_color(graph, strategy="largest_first")
+    colors = np.array([coloring[i] for i in range(quadratic.shape[0])], dtype=int)
+    variable_sets = [np.flatnonzero(colors == color) for color in range(colors.max() + 1)] if len(colors) else []
+    blocks = []
+    for variables in variable_sets:
+        # the quadratic terms are symmetric, so the columns of the variables are the transposed rows
+        couplings = quadratic[variables].T.tocsr()
+        neighbors = np.flatnonzero(np.diff(couplings.indptr))
+        couplings = couplings[neighbors]
+        dense = couplings.nnz > 0.1 * couplings.shape[0] * couplings.shape[1]
+        blocks.append((variables, neighbors, couplings.toarray() if dense else couplings))
+    return blocks
+
+
+def get_beta_range(linear: np.ndarray, quadratic: csr_matrix) -> (float, float):
+    """
+    Returns a default range of inverse temperatures. In the hottest sweep, the largest possible energy increase of a
+    single flip is accepted with probability 1/2, in the coldest sweep the smallest one with probability 1/100.
+
+    :param linear: linear terms
+    :type linear: np.ndarray
+    :param quadratic: symmetric matrix of the quadratic terms
+    :type quadratic: csr_matrix
+    :return: hot and cold inverse temperature
+    :rtype: tuple(float, float)
+    """
+    max_delta = np.max(np.abs(linear) + np.asarray(abs(quadratic).sum(axis=1)).ravel(), initial=0)
+    coefficients = np.abs(np.concatenate([linear, quadratic.data]))
+    coefficients = coefficients[coefficients > 0]
+    if max_delta == 0:
+        return 0.1, 1.0
+    return np.log(2) / max_delta, np.log(100) / coefficients.min()
+
+
+def get_beta_schedule(beta_range: (float, float), sweeps: int, schedule: str) -> np.ndarray:
+    """
+    Returns the inverse temperature of every sweep.
+
+    :param beta_range: hot and cold inverse temperature
+    :type beta_range: tuple(float, float)
+    :param sweeps: number of sweeps
+    :type sweeps: int
+    :param schedule: 'geometric' or 'linear' interpolation between the inverse temperatures
+    :type schedule: str
+    :return: inverse temperatures
+    :rtype: np.ndarray
+    """
+    if schedule == "geometric":
+        return np.geomspace(beta_range[0], beta_range[1], sweeps)
+    elif schedule == "linear":
+        return np.linspace(beta_range[0], beta_range[1], sweeps)
+    else:
+        raise NotImplementedError(f"Schedule {schedule} not implemented")
+
+
+def metropolis_sweep(states: np.ndarray, fields: np.ndarray, linear: np.ndarray, colors: list,
+                     beta: Union[float, np.ndarray], rng: np.random.Generator) -> None:
+    """
+    Performs one Metropolis sweep over all variables of all replicas in place. The variables of one color are
+    updated at the same time. The states are stored with one column per replica, so that the variables of a color
+    are contiguous rows.
+
+    :param states: binary states of shape (variables, replicas)
+    :type states: np.ndarray
+    :param fields: quadratic @ states, which is updated together with the states
+    :type fields: np.ndarray
+    :param linear: linear terms
+    :type linear: np.ndarray
+    :param colors: list of the variable indices, neighbor indices and couplings of every color, see color_variables
+    :type colors: list
+    :param beta: inverse temperature, either one for all replicas or an array of shape (1, replicas)
+    :type beta: float|np.ndarray
+    :param rng: random number generator
+    :type rng: np.random.Generator
+    :rtype: None
+    """
+    for variables, neighbors, couplings in colors:
+        # change of each variable if it is flipped and the resulting energy difference
+        changes = 1 - 2 * states[variables]
+        delta = changes * (linear[variables, np.newaxis] + fields[variables])
+        # flips which lower the energy are always accepted, since the random numbers are below 1
+        changes[rng.random(delta.shape) >= np.exp(-beta * np.maximum(delta, 0))] = 0
+        if not changes.any():
+            continue
+        states[variables] += changes
+        fields[neighbors] += couplings @ changes
+
+
+def get_energies(states: np.ndarray, linear: np.ndarray, quadratic: csr_matrix) -> np.ndarray:
+    """
+    Calculates the energies of a batch of states.
+
+    :param states: binary states of shape (variables, replicas)
+    :type states: np.ndarray
+    :param linear: linear terms
+    :type linear: np.ndarray
+    :param quadratic: symmetric matrix of the quadratic terms
+    :type quadratic: csr_matrix
+    :return: energy of every replica
+    :rtype: np.ndarray
+    """
+    return linear @ states + np.sum((quadratic @ states) * states, axis=0) / 2
+
+
+def _anneal(linear: np.ndarray, quadratic: csr_matrix, colors: list, betas: np.ndarray, num_reads: int,
+            seed: np.random.SeedSequence) -> np.ndarray:
+    """
+    Runs simulated annealing on a number of replicas starting from random states.
+
+    :param linear: linear terms
+    :type linear: np.ndarray
+    :param quadratic: symmetric matrix of the quadratic terms
+    :type quadratic: csr_matrix
+    :param colors: list of the variable indices, neighbor indices and couplings of every color, see color_variables
+    :type colors: list
+    :param betas: inverse temperature of every sweep
+    :type betas: np.ndarray
+    :param num_reads: number of replicas
+    :type num_reads: int
+    :param seed: seed of the random number generator
+    :type seed: np.random.SeedSequence
+    :return: final states of shape (variables, num_reads)
+    :rtype: np.ndarray
+    """
+    rng = np.random.default_rng(seed)
+    states = rng.integers(0, 2, size=(len(linear), num_reads)).astype(float)
+    fields = quadratic @ states
+    for beta in betas:
+        metropolis_sweep(states, fields, linear, colors, beta, rng)
+    return states
+
+
+class NumpySimulatedAnnealer(Device):
+    """
+    Simulated annealer running all reads at once as vectorized Metropolis sweeps. The reads can be split over
+    several processes.
+    """
+
+    def __init__(self):
+        """
+        Constructor method
+        """
+        super().__init__(device_name="numpy simulated annealer")
+        self.device = self
+
+    def get_parameter_options(self) -> dict:
+        """
+        Returns the configurable settings for this device
+
+        :return:
+                 .. code-block:: python
+
+                      return {
+                                "sweeps": {
+                                    "values": [1000, 100, 10000],
+                                    "description": "How many sweeps per read do you want?"
+                                },
+                                "schedule": {
+                                    "values": ["geometric", "linear"],
+                                    "description": "Which schedule of the inverse temperature do you want?"
+                                },
+                                "seed": {
+                                    "values": [None],
+                                    "description": "Which seed do you want?"
+                                },
+                                "processes": {
+                                    "values": [1, 2, 4],
+                                    "description": "How many processes should the reads be split over?"
+                                }
+                            }
+
+        """
+        return {
+            "sweeps": {
+                "values": [1000, 100, 10000],
+                "description": "How many sweeps per read do you want?"
+            },
+            "schedule": {
+                "values": ["geometric", "linear"],
+                "description": "Which schedule of the inverse temperature do you want?"
+            },
+            "seed": {
+                "values": [None],
+                "description": "Which seed do you want?"
+            },
+            "processes": {
+                "values": [1, 2, 4],
+                "description": "How many processes should the reads be split over?"
+            }
+        }
+
+    class Config(TypedDict):
+        """
+        Attributes of a valid config.
+
+        .. code-block:: python
+
+            sweeps: int
+            schedule: str
+            seed: int
+            processes: int
+            beta_range: list
+
+        """
+        sweeps: int
+        schedule: str
+        seed: int
+        processes: int
+        beta_range: list
+
+    def sample_qubo(self, Q: Union[dict, spmatrix], num_reads: int = 1) -> dimod.SampleSet:
+        """
+        Samples the QUBO with the settings given in the config of the device. The optional 'beta_range' overrides the
+        default range of inverse temperatures.
+
+        :param Q: QUBO as dict keyed by pairs of variables or as square sparse matrix
+        :type Q: dict|spmatrix
+        :param num_reads: number of reads
+        :type num_reads: int
+        :return: the samples of all reads and their energies
+        :rtype: dimod.SampleSet
+        """
+        config = self.config or {}
+        labels, linear, quadratic = qubo_to_csr(Q)
+        colors = color_variables(quadratic)
+        beta_range = config.get("beta_range") or get_beta_range(linear, quadratic)
+        betas = get_beta_schedule(beta_range, config.get("sweeps", 1000), config.get("schedule", "geometric"))
+        processes = max(1, min(config.get("processes", 1), num_reads))
+        logging.info(f"Annealing {len(labels)} variables with {len(colors)} colors, {len(betas)} sweeps and beta "
+                     f"range {beta_range} on {processes} process(es)")
+
+        # every process gets its own part of the reads and its own random number generator
+        reads = [len(part) for part in np.array_split(np.arange(num_reads), processes)]
+        seeds = np.random.SeedSequence(config.get("seed")).spawn(processes)
+        if processes == 1:
+            states = _anneal(linear, quadratic, colors, betas, reads[0], seeds[0])
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                states = np.concatenate(list(executor.map(_anneal, *zip(
+                    *[(linear, quadratic, colors, betas, n, seed) for n, seed in zip(reads, seeds)]))), axis=1)
+
+        return dimod.SampleSet.from_samples((states.T.astype(np.int8), labels), vartype=dimod.BINARY,
+                                            energy=get_energies(states, linear, quadratic))
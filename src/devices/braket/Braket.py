@@ -14,7 +14,9 @@
 
 import logging
 import os
-from abc import ABC
+from abc import ABC, abstractmethod
+from collections import deque
+from time import sleep
 
 import boto3
 from botocore.config import Config
@@ -26,6 +28,174 @@ from config import config
 from devices.Device import Device
 
 
+class TaskBackend(ABC):
+    """
+    Backend used by the BatchRunner to submit quantum tasks and to retrieve their states and results, so that the
+    BatchRunner can also be used with a local stand-in of a device.
+    """
+
+    @abstractmethod
+    def submit(self, circuit: any, shots: int) -> any:
+        """
+        Submits a circuit without waiting for its result.
+
+        :param circuit: the circuit
+        :type circuit: any
+        :param shots: number of shots
+        :type shots: int
+        :return: the task
+        :rtype: any
+        """
+        pass
+
+    @abstractmethod
+    def state(self, task: any) -> str:
+        """
+        Returns the state of a task, which is one of the states of the Amazon Braket quantum tasks, e.g. 'QUEUED',
+        'RUNNING', 'COMPLETED', 'FAILED' or 'CANCELLED'.
+
+        :param task: the task
+        :type task: any
+        :return: state of the task
+        :rtype: str
+        """
+        pass
+
+    @abstractmethod
+    def result(self, task: any) -> any:
+        """
+        Returns the result of a completed task.
+
+        :param task: the task
+        :type task: any
+        :return: result of the task
+        :rtype: any
+        """
+        pass
+
+    @abstractmethod
+    def cancel(self, task: any) -> None:
+        """
+        Cancels a task which is still queued or running.
+
+        :param task: the task
+        :type task: any
+        :rtype: None
+        """
+        pass
+
+
+class BraketTaskBackend(TaskBackend):
+    """
+    Backend submitting the tasks to an Amazon Braket device. Without S3 destination folder, the device is assumed to
+    be a local simulator.
+    """
+
+    def __init__(self, device: any, s3_destination_folder: tuple = None,
+                 poll_timeout_seconds: float = 3 * 24 * 60 * 60):
+        """
+        Constructor method
+        """
+        self.device = device
+        self.s3_destination_folder = s3_destination_folder
+        self.poll_timeout_seconds = poll_timeout_seconds
+
+    def submit(self, circuit: any, shots: int) -> any:
+        if self.s3_destination_folder is None:
+            return self.device.run(circuit, shots=shots)
+        return self.device.run(circuit, self.s3_destination_folder, shots=shots,
+                               poll_timeout_seconds=self.poll_timeout_seconds)
+
+    def state(self, task: any) -> str:
+        return task.state()
+
+    def result(self, task: any) -> any:
+        return task.result()
+
+    def cancel(self, task: any) -> None:
+        task.cancel()
+
+
+class BatchRunner:
+    """
+    Runs a batch of circuits, e.g. the circuits of a parameter sweep or of a finite-difference gradient, with at most
+    max_parallel tasks in flight at the same time. The tasks are polled with an interval which starts at
+    initial_poll_interval and grows by the factor backoff up to max_poll_interval, until one of the tasks completes.
+    If a task fails or is cancelled, the other tasks in flight are cancelled and the remaining circuits are not
+    submitted.
+    """
+
+    def __init__(self, backend: TaskBackend, max_parallel: int = 10, initial_poll_interval: float = 0.5,
+                 max_poll_interval: float = 10, backoff: float = 2):
+        """
+        Constructor method
+        """
+        self.backend = backend
+        self.max_parallel = max_parallel
+        self.initial_poll_interval = initial_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+
+    def run(self, circuits: list, shots: int) -> list:
+        """
+        Runs all circuits and waits for their results.
+
+        :param circuits: the circuits
+        :type circuits: list
+        :param shots: number of shots of every circuit
+        :type shots: int
+        :return: the results in the order of the circuits
+        :rtype: list
+        """
+        results = [None] * len(circuits)
+        pending = deque(enumerate(circuits))
+        running = {}
+        poll_interval = self.initial_poll_interval
+        while pending or running:
+            while pending and len(running) < self.max_parallel:
+                index, circuit = pending.popleft()
+                running[index] = self.backend.submit(circuit, shots)
+                logging.info(f"ID of task: {getattr(running[index], 'id', index)}")
+
+            completed = []
+            for index, task in running.items():
+                state = self.backend.state(task)
+                logging.debug(f"Status of task {getattr(task, 'id', index)}: {state}")
+                if state == 'COMPLETED':
+                    completed.append(index)
+                elif state in ('FAILED', 'CANCELLED'):
+                    # the other tasks would keep running on the device without anyone collecting their results
+                    self._cancel_all([other for other in running.items() if other[0] != index])
+                    pending.clear()
+                    raise RuntimeError(f"Task {getattr(task, 'id', index)} ended in state {state}")
+            for index in completed:
+                results[index] = self.backend.result(running.pop(index))
+
+            if completed:
+                # free slots are filled right away and the polling starts fast again
+                poll_interval = self.initial_poll_interval
+            elif running:
+                sleep(poll_interval)
+                poll_interval = min(poll_interval * self.backoff, self.max_poll_interval)
+        return results
+
+    def _cancel_all(self, tasks: list) -> None:
+        """
+        Cancels tasks which are still in flight. A task which can not be cancelled is logged and skipped, so that
+        the remaining tasks are cancelled nevertheless.
+
+        :param tasks: pairs of the index of the circuit and its task
+        :type tasks: list
+        :rtype: None
+        """
+        for index, task in tasks:
+            try:
+                self.backend.cancel(task)
+                logging.info(f"Cancelled task {getattr(task, 'id', index)}")
+            except Exception as e:
+                logging.warning(f"Unable to cancel task {getattr(task, 'id', index)}: {e}")
+
+
 class Braket(Device, ABC):
     """
     Abstract class to use the Amazon Braket devices.
@@ -79,6 +249,17 @@ class Braket(Device, ABC):
             logging.error(f"AWS-Profile {profile_name} could not be found! Please set env-variable AWS_PROFILE. "
                           f"Only LocalSimulator is available.")
 
+    def get_batch_runner(self, max_parallel: int = 10) -> BatchRunner:
+        """
+        Returns a BatchRunner which submits the circuits to this device.
+
+        :param max_parallel: maximum number of tasks in flight at the same time
+        :type max_parallel: int
+        :return: the batch runner
+        :rtype: BatchRunner
+        """
+        return BatchRunner(BraketTaskBackend(self.device, self.s3_destination_folder), max_parallel=max_parallel)
+
     def init_s3_storage(self, folder_name: str) -> None:
         """
         Calls function to create a s3 folder that is needed for Amazon Braket.
@@ -24,6 +24,7 @@ install_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(install_dir)
 
 import argparse  # noqa E402
+import re  # noqa E402
 from collections.abc import Iterable  # noqa E402
 from typing import Union  # noqa E402
 from BenchmarkManager import BenchmarkManager  # noqa E402
@@ -73,6 +74,29 @@ def _expand_paths(j: Union[dict, list], base_dir: str) -> Union[dict, list]:
     return j
 
 
+def _parse_filter(expression: str) -> tuple:
+    """
+    Parses a filter on a column of the results like 'application_config.variables>8' or 'solver in [Annealer, QAOA]'
+    into a filter tuple in the format of pandas.read_parquet. The value is parsed as YAML, so numbers, booleans and
+    lists get their type.
+
+    :param expression: the filter expression
+    :type expression: str
+    :return: tuple of column, operator and value
+    :rtype: tuple
+    """
+    match = re.fullmatch(r"\s*([\w.]+)\s*(==|!=|>=|<=|=|>|<)\s*(.+?)\s*", expression) or \
+        re.fullmatch(r"\s*([\w.]+)\s+(not in|in)\s+(.+?)\s*", expression)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid filter '{expression}', expected e.g. "
+                                         f"'application_config.variables>8'")
+    column, operator, value = match.groups()
+    value = yaml.safe_load(value)
+    if operator in ("in", "not in") and not isinstance(value, list):
+        raise argparse.ArgumentTypeError(f"Invalid filter '{expression}', '{operator}' expects a list like [1, 2]")
+    return column, operator, value
+
+
 def main() -> None:
     """
     Main function that triggers the benchmarking process.
@@ -101,10 +125,21 @@ def main() -> None:
         parser.add_argument("-c", "--config", help="Provide valid config file instead of interactive mode")
         parser.add_argument('-s', '--summarize', nargs='+', help='If you want to summarize multiple experiments',
                             required=False)
+        parser.add_argument('-f', '--filter', type=_parse_filter, action='append', dest='filters',
+                            help="Only summarize the results matching the filter, e.g. "
+                                 "'application_config.variables>8'. Can be given several times, the filters are "
+                                 "combined with 'and'")
         parser.add_argument('-m', '--modules', help="Provide a file listing the modules to be loaded")
+        parser.add_argument('-w', '--workers', type=int, default=1,
+                            help="Number of worker processes used to run the benchmark in parallel")
+        parser.add_argument('-r', '--resume',
+                            help="Provide the directory of an interrupted benchmark run which should be continued")
+        parser.add_argument('--mapping-cache-dir',
+                            help="Directory to keep the mapped problems in, so that they can be reused by the worker "
+                                 "processes and later benchmark runs")
         args = parser.parse_args()
         if args.summarize:
-            benchmark_manager.summarize_results(args.summarize)
+            benchmark_manager.summarize_results(args.summarize, filters=args.filters)
         else:
             if args.modules:
                 logging.info(f"load application modules configuration from {args.modules}")
@@ -113,7 +148,12 @@ def main() -> None:
                 #   + replace relative paths by taking them relative to the location of the modules configuration file.
                 base_dir = os.path.dirname(args.modules)
                 app_modules = _expand_paths(json.loads(_filter_comments(open(args.modules))), base_dir)
-            if args.config:
+            if args.resume:
+                logging.info(f"Resuming benchmark run at {args.resume}")
+                # The config of the interrupted run is used
+                with open(f"{args.resume}/config.yml") as f:
+                    benchmark_config = yaml.load(f, Loader=yaml.FullLoader)
+            elif args.config:
                 logging.info(f"Provided config file at {args.config}")
                 # Load config
                 f = open(args.config)
@@ -123,7 +163,8 @@ def main() -> None:
             else:
                 benchmark_config = benchmark_manager.generate_benchmark_configs(app_modules)
 
-            benchmark_manager.orchestrate_benchmark(benchmark_config, app_modules)
+            benchmark_manager.orchestrate_benchmark(benchmark_config, app_modules, workers=args.workers,
+                                                    resume_dir=args.resume, mapping_cache_dir=args.mapping_cache_dir)
             df = benchmark_manager.load_results()
             benchmark_manager.visualize_results(df)
     except Exception as e:
@@ -14,6 +14,7 @@
 
 from typing import TypedDict, Union
 
+from devices.NumpySimulatedAnnealer import NumpySimulatedAnnealer
 from devices.SimulatedAnnealingSampler import SimulatedAnnealingSampler
 from solvers.Solver import *
 
@@ -28,11 +29,13 @@ class Annealer(Solver):
         Constructor method
         """
         super().__init__()
-        self.device_options = ["Simulated Annealer"]
+        self.device_options = ["Simulated Annealer", "NumPy Simulated Annealer"]
 
-    def get_device(self, device_option: str) -> Union[SimulatedAnnealingSampler]:
+    def get_device(self, device_option: str) -> Union[SimulatedAnnealingSampler, NumpySimulatedAnnealer]:
         if device_option == "Simulated Annealer":
             return SimulatedAnnealingSampler()
+        elif device_option == "NumPy Simulated Annealer":
+            return NumpySimulatedAnnealer()
         else:
             raise NotImplementedError(f"Device Option {device_option}  not implemented")
 
@@ -47,6 +50,11 @@ class Annealer(Solver):
                                 "number_of_reads": {
                                     "values": [100, 250, 500, 750, 1000],
                                     "description": "How many reads do you need?"
+                                },
+                                "evaluate_all_samples": {
+                                    "values": [False, True],
+                                    "description": "Do you want to evaluate all samples instead of only the one "
+                                                   "with the lowest energy?"
                                 }
                             }
 
@@ -55,6 +63,10 @@ class Annealer(Solver):
             "number_of_reads": {
                 "values": [100, 250, 500, 750, 1000],
                 "description": "How many reads do you need?"
+            },
+            "evaluate_all_samples": {
+                "values": [False, True],
+                "description": "Do you want to evaluate all samples instead of only the one with the lowest energy?"
             }
         }
 
@@ -65,9 +77,11 @@ class Annealer(Solver):
         .. code-block:: python
 
             number_of_reads: int
+            evaluate_all_samples: bool
 
         """
         number_of_reads: int
+        evaluate_all_samples: bool
 
     def run(self, mapped_problem: dict, device_wrapper: any, config: Config, **kwargs: dict) -> (dict, float):
         """
@@ -81,7 +95,9 @@ class Annealer(Solver):
         :type config: Config
         :param kwargs:
         :type kwargs: any
-        :return: Solution, the time it took to compute it and optional additional information
+        :return: Solution, the time it took to compute it and optional additional information. If
+                 'evaluate_all_samples' is set in the config, the solution is the list of all samples ordered by their
+                 energy, so that the benchmark manager can evaluate each of them.
         :rtype: tuple(list, float, dict)
         """
 
@@ -89,7 +105,7 @@ class Annealer(Solver):
         additional_solver_information = {}
         device = device_wrapper.get_device()
         start = time() * 1000
-        if device_wrapper.device_name != "simulated annealer":
+        if device_wrapper.device_name not in ["simulated annealer", "numpy simulated annealer"]:
             logging.warning("Only simulated annealer available at the moment!")
             # TODO: Check what to do with this..
             # This section was used to leverage the D-Wave devices previously available on Amazon Braket
@@ -110,12 +126,16 @@ class Annealer(Solver):
             # # Add timings https://docs.dwavesys.com/docs/latest/c_qpu_timing.html
             # additional_solver_information.update(response.info["additionalMetadata"]["dwaveMetadata"]["timing"])
         else:
-            # This is for D-Wave simulated Annealer
+            # This is for the D-Wave simulated Annealer and the NumPy simulated annealer
             response = device.sample_qubo(Q, num_reads=config['number_of_reads'])
         time_to_solve = round(time() * 1000 - start, 3)
 
-        # take the result with the lowest energy:
-        sample = response.lowest().first.sample
+        if config.get('evaluate_all_samples', False):
+            # return all samples, starting with the one with the lowest energy
+            sample = [dict(sample) for sample in response.samples(sorted_by='energy')]
+        else:
+            # take the result with the lowest energy:
+            sample = response.lowest().first.sample
         # logging.info("Result:" + str({k: v for k, v in sample.items() if v == 1}))
         logging.info(f'Annealing finished in {time_to_solve} ms.')
 
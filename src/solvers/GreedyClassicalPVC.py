@@ -15,7 +15,9 @@
 from typing import TypedDict
 
 import networkx
+import numpy as np
 
+from applications.PVC.EdgeIndex import get_edge_index
 from devices.Local import Local
 from solvers.Solver import *
 
@@ -71,10 +73,8 @@ class GreedyClassicalPVC(Solver):
         :rtype: tuple(list, float, dict)
         """
 
-        # Need to deep copy since we are modifying the graph in this function. Else the next repetition would work
-        # with a different graph
-        mapped_problem = mapped_problem.copy()
         start = time() * 1000
+        edge_index = get_edge_index(mapped_problem)
         # We always start at the base node
         current_node = ((0, 0), 1, 1)
         idx = 1
@@ -82,22 +82,25 @@ class GreedyClassicalPVC(Solver):
         tour = dict()
         tour[current_node + (0,)] = 1  # (0,) is the timestep we visit this node
 
+        # Instead of removing the visited seams from the graph, we keep track of the remaining nodes
+        remaining = np.ones(len(edge_index["nodes"]), dtype=bool)
+        current = (edge_index["node_index"][current_node[0]], edge_index["config_index"][current_node[1]],
+                   edge_index["tool_index"][current_node[2]])
+
         # Tour needs to cover all nodes, if there are 2 nodes left we can finish since these 2 nodes belong to the same seam
-        while len(mapped_problem.nodes) > 2:
-            # Get the minimum neighbor edge from the current node
-            next_node = min([x for x in mapped_problem.edges(current_node[0], data=True) if
-                             x[2]['c_start'] == current_node[1] and x[2]['t_start'] == current_node[2]],
-                            key=lambda x: x[2]['weight'])
-            next_node = (next_node[1], next_node[2]["c_end"], next_node[2]["t_end"])
+        while remaining.sum() > 2:
+            # Get the minimum neighbor edge from the current node, indexed by (node, c_end, t_end)
+            weights = np.where(remaining[:, None, None],
+                               edge_index["min_weights"][current[0], :, current[1], current[2]], np.nan)
+            next_node = np.unravel_index(np.nanargmin(weights), weights.shape)
 
             # Make the step - add distance to cost, add the best node to tour,
-            tour[next_node + (idx,)] = 1
+            tour[(edge_index["nodes"][next_node[0]], edge_index["configs"][next_node[1]],
+                  edge_index["tools"][next_node[2]], idx)] = 1
 
             # Remove all node of that seam
-            to_remove = [x for x in mapped_problem.nodes if x[0] == current_node[0][0]]
-            for node in to_remove:
-                mapped_problem.remove_node(node)
-            current_node = next_node
+            remaining[edge_index["seam_index"][edge_index["seams"][current[0]]]] = False
+            current = next_node
             idx += 1
 
         # Tour needs to look like {((0, 0), 1, 1, 0): 1, ((3, 1), 1, 0, 1): 1, ((2, 1), 1, 1, 2): 1, ((4, 4), 1, 1, 3): 1}
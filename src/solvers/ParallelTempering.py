@@ -0,0 +1,209 @@
+#  Copyright 2021 The QUARK Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypedDict, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from devices.Local import Local
+from devices.NumpySimulatedAnnealer import color_variables, get_beta_range, get_energies, metropolis_sweep, \
+    qubo_to_csr
+from solvers.Solver import *
+
+
+def _parallel_tempering(linear: np.ndarray, quadratic: csr_matrix, colors: list, betas: np.ndarray, sweeps: int,
+                        seed: np.random.SeedSequence) -> (np.ndarray, float, float):
+    """
+    Runs one replica per inverse temperature. After every sweep, the temperatures of neighboring replicas are swapped
+    with the Metropolis criterion, alternating between the even and the odd pairs of the ladder.
+
+    :param linear: linear terms
+    :type linear: np.ndarray
+    :param quadratic: symmetric matrix of the quadratic terms
+    :type quadratic: csr_matrix
+    :param colors: list of the variable indices, neighbor indices and couplings of every color, see color_variables
+    :type colors: list
+    :param betas: ladder of inverse temperatures
+    :type betas: np.ndarray
+    :param sweeps: number of sweeps
+    :type sweeps: int
+    :param seed: seed of the random number generator
+    :type seed: np.random.SeedSequence
+    :return: the state with the lowest energy found, its energy and the acceptance rate of the swaps
+    :rtype: tuple(np.ndarray, float, float)
+    """
+    rng = np.random.default_rng(seed)
+    replicas = len(betas)
+    states = rng.integers(0, 2, size=(len(linear), replicas)).astype(float)
+    fields = quadratic @ states
+    # replica_at[k] is the replica at position k of the ladder, positions[r] the position of replica r
+    replica_at = np.arange(replicas)
+    positions = np.arange(replicas)
+    best_state, best_energy = None, np.inf
+    swaps_accepted, swaps_attempted = 0, 0
+
+    for sweep in range(sweeps):
+        metropolis_sweep(states, fields, linear, colors, betas[positions][np.newaxis, :], rng)
+        energies = linear @ states + np.sum(fields * states, axis=0) / 2
+        best = np.argmin(energies)
+        if energies[best] < best_energy:
+            best_state, best_energy = states[:, best].copy(), energies[best]
+
+        pairs = np.arange(sweep % 2, replicas - 1, 2)
+        lower, upper = replica_at[pairs], replica_at[pairs + 1]
+        swap = np.log(rng.random(len(pairs))) < (betas[pairs] - betas[pairs + 1]) * (energies[lower] - energies[upper])
+        replica_at[pairs[swap]], replica_at[pairs[swap] + 1] = upper[swap], lower[swap]
+        positions[replica_at] = np.arange(replicas)
+        swaps_accepted += np.count_nonzero(swap)
+        swaps_attempted += len(pairs)
+
+    return best_state, best_energy, swaps_accepted / max(swaps_attempted, 1)
+
+
+class ParallelTempering(Solver):
+    """
+    Parallel tempering (replica exchange) solver for QUBOs. Replicas at a ladder of temperatures are updated with
+    vectorized Metropolis sweeps and periodically exchange their temperatures, so that replicas stuck in a local
+    minimum can escape at a higher temperature.
+    """
+
+    def __init__(self):
+        """
+        Constructor method
+        """
+        super().__init__()
+        self.device_options = ["Local"]
+
+    def get_device(self, device_option: str) -> Local:
+        if device_option == "Local":
+            return Local()
+        else:
+            raise NotImplementedError(f"Device Option {device_option} not implemented")
+
+    def get_parameter_options(self) -> dict:
+        """
+        Returns the configurable settings for this solver
+
+        :return:
+                 .. code-block:: python
+
+                      return {
+                                "number_of_replicas": {
+                                    "values": [16, 8, 32],
+                                    "description": "How many replicas (temperatures) do you want?"
+                                },
+                                "sweeps": {
+                                    "values": [1000, 100, 10000],
+                                    "description": "How many sweeps do you want?"
+                                },
+                                "temperature_range": {
+                                    "values": ["auto"],
+                                    "description": "Which range of temperatures [min, max] do you want?"
+                                },
+                                "processes": {
+                                    "values": [1, 2, 4],
+                                    "description": "How many independent runs in parallel processes do you want?"
+                                }
+                            }
+
+        """
+        return {
+            "number_of_replicas": {
+                "values": [16, 8, 32],
+                "description": "How many replicas (temperatures) do you want?"
+            },
+            "sweeps": {
+                "values": [1000, 100, 10000],
+                "description": "How many sweeps do you want?"
+            },
+            "temperature_range": {
+                "values": ["auto"],
+                "description": "Which range of temperatures [min, max] do you want?"
+            },
+            "processes": {
+                "values": [1, 2, 4],
+                "description": "How many independent runs in parallel processes do you want?"
+            }
+        }
+
+    class Config(TypedDict):
+        """
+        Attributes of a valid config. If the temperature range is 'auto', it is derived from the coefficients of the
+        QUBO. The optional seed makes the runs reproducible.
+
+        .. code-block:: python
+
+            number_of_replicas: int
+            sweeps: int
+            temperature_range: Union[str, list]
+            processes: int
+            seed: int
+
+        """
+        number_of_replicas: int
+        sweeps: int
+        temperature_range: Union[str, list]
+        processes: int
+        seed: int
+
+    def run(self, mapped_problem: dict, device_wrapper: any, config: Config, **kwargs: dict) -> (dict, float, dict):
+        """
+        Parallel tempering solver.
+
+        :param mapped_problem: dictionary with the key 'Q' where its value should be the QUBO
+        :type mapped_problem: dict
+        :param device_wrapper: Local device
+        :type device_wrapper: any
+        :param config: Parallel tempering settings
+        :type config: Config
+        :param kwargs: no additionally settings needed
+        :type kwargs: any
+        :return: Solution, the time it took to compute it and optional additional information
+        :rtype: tuple(dict, float, dict)
+        """
+        start = time() * 1000
+        labels, linear, quadratic = qubo_to_csr(mapped_problem['Q'])
+        colors = color_variables(quadratic)
+
+        temperature_range = config.get('temperature_range', "auto")
+        if temperature_range == "auto":
+            beta_hot, beta_cold = get_beta_range(linear, quadratic)
+            temperature_range = [float(1 / beta_cold), float(1 / beta_hot)]
+        betas = 1 / np.geomspace(temperature_range[0], temperature_range[1], config['number_of_replicas'])
+
+        # every process runs its own ladder of replicas with its own random number generator
+        processes = config.get('processes', 1)
+        seeds = np.random.SeedSequence(config.get('seed')).spawn(processes)
+        arguments = [(linear, quadratic, colors, betas, config['sweeps'], seed) for seed in seeds]
+        if processes == 1:
+            results = [_parallel_tempering(*arguments[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_parallel_tempering, *zip(*arguments)))
+
+        best_state, _, _ = min(results, key=lambda result: result[1])
+        best_energy = get_energies(best_state[:, np.newaxis], linear, quadratic)[0]
+        time_to_solve = round(time() * 1000 - start, 3)
+        logging.info(f"Parallel tempering with {len(betas)} replicas at temperatures {temperature_range} found "
+                     f"energy {best_energy} in {time_to_solve} ms")
+
+        sample = {label: int(value) for label, value in zip(labels, best_state)}
+        additional_solver_information = {
+            "best_energy": float(best_energy),
+            "temperature_range": list(temperature_range),
+            "swap_acceptance_rate": float(np.mean([result[2] for result in results]))
+        }
+        return sample, time_to_solve, additional_solver_information
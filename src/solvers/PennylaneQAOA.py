@@ -13,7 +13,8 @@
 #  limitations under the License.
 import inspect
 import ast
-from collections import Counter
+import hashlib
+from collections import OrderedDict
 from typing import TypedDict, Union
 import types
 import matplotlib.pyplot as plt
@@ -29,6 +30,7 @@ from devices.braket.OQC import OQC
 from devices.braket.SV1 import SV1
 from devices.braket.TN1 import TN1
 from devices.HelperClass import HelperClass
+from devices.IsingStatevector import IsingStatevector
 from solvers.Solver import *
 
 
@@ -53,9 +55,13 @@ class PennylaneQAOA(Solver):
                                "default.qubit.autograd",
                                "qulacs.simulator",
                                "lightning.gpu",
-                               "lightning.qubit"]
+                               "lightning.qubit",
+                               "ising.statevector"]
+        # cost and mixer hamiltonians of the recently solved problems, keyed by the fingerprint of J, t and the scale
+        self.operator_cache = OrderedDict()
+        self.operator_cache_size = 4
 
-    def get_device(self, device_option: str) -> Union[Ionq, SV1, TN1, Rigetti, OQC, HelperClass]:
+    def get_device(self, device_option: str) -> Union[Ionq, SV1, TN1, Rigetti, OQC, HelperClass, IsingStatevector]:
         if device_option == "arn:aws:braket:::device/qpu/ionq/ionQdevice":
             return Ionq("ionq", "arn:aws:braket:::device/qpu/ionq/ionQdevice")
         elif device_option == "arn:aws:braket:::device/quantum-simulator/amazon/sv1":
@@ -78,6 +84,8 @@ class PennylaneQAOA(Solver):
             return HelperClass("lightning.gpu")
         elif device_option == "lightning.qubit":
             return HelperClass("lightning.qubit")
+        elif device_option == "ising.statevector":
+            return IsingStatevector()
         else:
             raise NotImplementedError(f"Device Option {device_option} not implemented")
 
@@ -108,6 +116,21 @@ class PennylaneQAOA(Solver):
                                         "stepsize": {
                                             "values": [0.0001, 0.001, 0.01, 0.1, 1],
                                             "description": "Which stepsize do you want?"
+                                        },
+                                        "probs_storage": {
+                                            "values": ["json", "npz", "top_k"],
+                                            "description": "How do you want to store the final probability "
+                                                           "distribution?"
+                                        },
+                                        "top_k": {
+                                            "values": [100, 10, 1000],
+                                            "description": "How many of the most probable bitstrings do you "
+                                                           "want to store with 'top_k'?"
+                                        },
+                                        "track_bitstrings": {
+                                            "values": [False, True],
+                                            "description": "Do you want to record the most probable bitstring "
+                                                           "of every optimization step?"
                                         }
                                     }
 
@@ -132,12 +155,28 @@ class PennylaneQAOA(Solver):
             "stepsize": {
                 "values": [0.0001, 0.001, 0.01, 0.1, 1],
                 "description": "Which stepsize do you want?"
+            },
+            "probs_storage": {
+                "values": ["json", "npz", "top_k"],
+                "description": "How do you want to store the final probability distribution?"
+            },
+            "top_k": {
+                "values": [100, 10, 1000],
+                "description": "How many of the most probable bitstrings do you want to store with 'top_k'?"
+            },
+            "track_bitstrings": {
+                "values": [False, True],
+                "description": "Do you want to record the most probable bitstring of every optimization step?"
             }
         }
 
     class Config(TypedDict):
         """
-        Attributes of a valid config
+        Attributes of a valid config. The final probability distribution is stored either as dict in the JSON file of
+        the QAOA details ('json'), as compressed NumPy array in a separate file ('npz') or as dict of only the top_k
+        most probable bitstrings in the JSON file ('top_k', by default the top 100). If track_bitstrings is set, the
+        distribution is evaluated after every optimization step and the most probable bitstring of every step is
+        stored, otherwise it is only evaluated once for the best parameters.
 
         .. code-block:: python
 
@@ -147,6 +186,9 @@ class PennylaneQAOA(Solver):
             layers: int
             coeff_scale: float
             stepsize: float
+            probs_storage: str
+            top_k: int
+            track_bitstrings: bool
 
         """
         shots: int
@@ -155,6 +197,9 @@ class PennylaneQAOA(Solver):
         layers: int
         coeff_scale: float
         stepsize: float
+        probs_storage: str
+        top_k: int
+        track_bitstrings: bool
 
     @staticmethod
     def normalize_data(data: any, scale: float = 1.0) -> any:
@@ -171,9 +216,9 @@ class PennylaneQAOA(Solver):
         return scale * data / np.max(np.abs(data))
 
     @staticmethod
-    def qaoa_operators_from_ising(J: any, t: any, scale: float = 1.0) -> (any, any):
+    def scale_coefficients(J: any, t: any, scale: float = 1.0) -> float:
         """
-        Generates pennylane cost and mixer hamiltonians from the Ising matrix J and vector t.
+        Scales the Ising matrix J and vector t in place by scale * the maximum absolute coefficient.
 
         :param J: J matrix
         :type J: any
@@ -181,51 +226,136 @@ class PennylaneQAOA(Solver):
         :type t: any
         :param scale:
         :type scale: float
-        :return:
-        :rtype: tuple(any, any)
+        :return: the scaling factor
+        :rtype: float
         """
         # we define the scaling factor as scale * the maximum parameter found in the coefficients
         scaling_factor = scale * max(np.max(np.abs(J.flatten())), np.max(np.abs(t)))
         # we scale the coefficients
         J /= scaling_factor
         t /= scaling_factor
+        return scaling_factor
 
-        sigzsigz_arr = np.array(
-            [[qml.PauliZ(i) @ qml.PauliZ(j) for i in range(len(J))]
-             for j in range(len(J))])
+    @staticmethod
+    def qaoa_operators_from_ising(J: any, t: any, scale: float = 1.0) -> (any, any):
+        """
+        Generates pennylane cost and mixer hamiltonians from the Ising matrix J and vector t. The cost hamiltonian
+        only contains the non-zero coefficients, with the symmetric couplings J_ij and J_ji merged into one term.
 
-        sigz_arr = [qml.PauliZ(i) for i in range(len(t))]
-        # one body terms (h_i * sig_z^(i))
-        # two body terms (J_ij * sig_z^(i) \otimes * sig_z^(j))
+        :param J: J matrix
+        :type J: any
+        :param t: t vector
+        :type t: any
+        :param scale:
+        :type scale: float
+        :return: cost and mixer hamiltonian
+        :rtype: tuple(any, any)
+        """
+        PennylaneQAOA.scale_coefficients(J, t, scale)
+
+        # one body terms (h_i * sig_z^(i)) of the non-zero coefficients
+        linear = np.flatnonzero(t)
+        # two body terms (J_ij * sig_z^(i) \otimes * sig_z^(j)), where J_ij and J_ji are merged into one term
+        couplings = np.triu(J + J.T, k=1)
+        rows, cols = np.nonzero(couplings)
+        coeffs = [*t[linear], *couplings[rows, cols]]
+        ops = [*[qml.PauliZ(int(i)) for i in linear],
+               *[qml.PauliZ(int(i)) @ qml.PauliZ(int(j)) for i, j in zip(rows, cols)]]
+        # sig_z^(i) \otimes sig_z^(i) is the identity, so the diagonal of J only adds a constant
+        offset = np.trace(J)
+        if offset != 0 or not ops:
+            coeffs.append(offset)
+            ops.append(qml.Identity(0))
         # total cost function
-        h_cost = qml.Hamiltonian([*t, *J.flatten()], [*sigz_arr, *sigzsigz_arr.flatten()],
-                                 simplify=True)
+        h_cost = qml.Hamiltonian(coeffs, ops)
 
         # definition of the mixer hamiltonian
         h_mixer = -1 * qml.qaoa.mixers.x_mixer(range(len(J)))
 
         return h_cost, h_mixer
 
-    def run(self, mapped_problem: any, device_wrapper: any, config: Config, **kwargs: dict) -> (any, any, float):
+    def get_qaoa_operators(self, J: any, t: any, scale: float = 1.0) -> (any, any):
         """
-        Runs Pennylane QAOA on the Ising problem.
+        Returns the cost and mixer hamiltonians of qaoa_operators_from_ising, which are cached per problem, so that
+        they are only generated once for all repetitions and solver configs of a mapped problem. J and t are scaled in
+        place in either case.
 
-        :param mapped_problem: Ising
-        :type mapped_problem: any
+        :param J: J matrix
+        :type J: any
+        :param t: t vector
+        :type t: any
+        :param scale:
+        :type scale: float
+        :return: cost and mixer hamiltonian
+        :rtype: tuple(any, any)
+        """
+        fingerprint = hashlib.sha256()
+        for array in (J, t):
+            array = np.ascontiguousarray(array, dtype=float)
+            fingerprint.update(str(array.shape).encode())
+            fingerprint.update(array.tobytes())
+        fingerprint.update(str(scale).encode())
+        key = fingerprint.hexdigest()
+
+        if key in self.operator_cache:
+            self.operator_cache.move_to_end(key)
+            self.scale_coefficients(J, t, scale)
+            return self.operator_cache[key]
+
+        operators = self.qaoa_operators_from_ising(J, t, scale)
+        self.operator_cache[key] = operators
+        while len(self.operator_cache) > self.operator_cache_size:
+            self.operator_cache.popitem(last=False)
+        return operators
+
+    def _setup_statevector(self, J: any, t: any, device_wrapper: IsingStatevector, config: Config) -> tuple:
+        """
+        Sets up the QAOA circuit on the Ising state vector simulator. The expectation value and its gradient are
+        calculated exactly in the same pass, also if shots are configured, which are only used to sample the final
+        state.
+
+        :param J: J matrix
+        :type J: any
+        :param t: t vector
+        :type t: any
+        :param device_wrapper: Ising state vector simulator
+        :type device_wrapper: IsingStatevector
+        :param config:
+        :type config: Config
+        :return: cost function, gradient function, probability circuit, sample circuit and the quantum timings
+        :rtype: tuple
+        """
+        self.scale_coefficients(J, t, scale=config['coeff_scale'])
+        simulator = device_wrapper.get_device()
+        simulator.set_problem(J, t)
+
+        def grad_fn(params):
+            # the optimizer takes the cost from the forward attribute instead of evaluating the circuit again
+            grad_fn.forward, grad = simulator.expval_and_grad(params)
+            return grad
+
+        def samples(params):
+            return simulator.sample(params, config['shots'])
+
+        return simulator.expval, grad_fn, simulator.probs, samples, simulator.timings
+
+    def _setup_pennylane(self, J: any, t: any, device_wrapper: any, config: Config) -> tuple:
+        """
+        Sets up the QAOA circuit on a pennylane device.
+
+        :param J: J matrix
+        :type J: any
+        :param t: t vector
+        :type t: any
         :param device_wrapper:
         :type device_wrapper: any
         :param config:
         :type config: Config
-        :param kwargs: contains store_dir for the plot of the optimization
-        :type kwargs: any
-        :return: Solution, the time it took to compute it and optional additional information
-        :rtype: tuple(list, float, dict)
+        :return: cost function, gradient function, probability circuit, sample circuit and the quantum timings
+        :rtype: tuple
         """
-
-        J = mapped_problem['J']
-        t = mapped_problem['t']
         wires = J.shape[0]
-        cost_h, mixer_h = self.qaoa_operators_from_ising(J, t, scale=config['coeff_scale'])
+        cost_h, mixer_h = self.get_qaoa_operators(J, t, scale=config['coeff_scale'])
 
         # set up the problem
         try:
@@ -287,11 +417,88 @@ class PennylaneQAOA(Solver):
         if "execute" not in called_functions:
             dev.batch_execute = real_decorator(dev.batch_execute)
 
+        @qml.qnode(dev)
+        def samples(params):
+            circuit(params)
+            return [qml.sample(qml.PauliZ(i)) for i in range(wires)]
+
+        @qml.qnode(dev)
+        def probability_circuit(params):
+            circuit(params)
+            return qml.probs(wires=range(wires))
+
+        # the gradient is calculated by the optimizer
+        return cost_function, None, probability_circuit, samples, dev.timings
+
+    @staticmethod
+    def _plot_cost(cost_pt: list, config: Config, path: str) -> None:
+        """
+        Plots the cost of every optimization step.
+
+        :param cost_pt: cost of every optimization step
+        :type cost_pt: list
+        :param config:
+        :type config: Config
+        :param path: path of the plot
+        :type path: str
+        :rtype: None
+        """
+        plt.figure(figsize=(6, 4))
+        plt.plot(range(len(cost_pt)), cost_pt, label='global minimum')
+        plt.xlabel("Optimization steps")
+        plt.ylabel("Cost / Energy")
+        plt.title('/'.join(['%s: %s' % (key, value) for (key, value) in config.items()]))
+        plt.legend()
+        plt.savefig(path, dpi=300)
+        plt.close()
+
+    def run(self, mapped_problem: any, device_wrapper: any, config: Config, **kwargs: dict) -> (any, any, float):
+        """
+        Runs Pennylane QAOA on the Ising problem.
+
+        :param mapped_problem: Ising
+        :type mapped_problem: any
+        :param device_wrapper:
+        :type device_wrapper: any
+        :param config:
+        :type config: Config
+        :param kwargs: contains store_dir for the plot of the optimization
+        :type kwargs: any
+        :return: Solution, the time it took to compute it and optional additional information
+        :rtype: tuple(list, float, dict)
+        """
+
+        J = mapped_problem['J']
+        t = mapped_problem['t']
+        wires = J.shape[0]
+
+        if isinstance(device_wrapper, IsingStatevector):
+            cost_function, grad_fn, probability_circuit, samples, timings = self._setup_statevector(
+                J, t, device_wrapper, config)
+        else:
+            cost_function, grad_fn, probability_circuit, samples, timings = self._setup_pennylane(
+                J, t, device_wrapper, config)
+
         # Initialize variational parameters randomly
         rand_params = np.random.uniform(size=[2, config['layers']])
         params = npqml.array(rand_params, requires_grad=True)
         logging.info(f"Starting params: {params}")
 
+        def evaluate_params_sampling(params):
+            s = np.asarray(samples([params[0], params[1]]))
+            bits = np.rint((1 - s) / 2).astype(np.int64)
+            # index of the measured basis state, where wire 0 is the most significant bit
+            indices = (1 << np.arange(wires - 1, -1, -1)) @ bits
+            probs = np.bincount(indices, minlength=2 ** wires) / config['shots']
+            return _index_to_bitstring(np.argmax(probs), wires), probs
+
+        def evaluate_params_probs(params):
+            probs = np.array(probability_circuit([params[0], params[1]]))
+            return _index_to_bitstring(np.argmax(probs), wires), probs
+
+        evaluate_params = evaluate_params_probs if config['shots'] is None else evaluate_params_sampling
+        track_bitstrings = config.get('track_bitstrings', False)
+
         # Optimization Loop
         # optimizer = qml.GradientDescentOptimizer(stepsize=config['stepsize'])
         optimizer = qml.MomentumOptimizer(stepsize=config['stepsize'], momentum=0.9)
@@ -300,15 +507,17 @@ class PennylaneQAOA(Solver):
         additional_solver_information = {}
         min_param = None
         min_cost = None
+        min_probs = None
         cost_pt = []
         params_list = []
-        x = []
+        # bitstring with the highest probability per iteration
+        bitstring_list = []
         run_id = round(time())
         start = time() * 1000
         for iteration in range(config['iterations']):
             t0 = time()
             # Evaluates the cost, then does a gradient step to new params
-            params, cost_before = optimizer.step_and_cost(cost_function, params)
+            params, cost_before = optimizer.step_and_cost(cost_function, params, grad_fn=grad_fn)
             # Convert cost_before to a float, so it's easier to handle
             cost_before = float(cost_before)
             t1 = time()
@@ -318,85 +527,84 @@ class PennylaneQAOA(Solver):
                 logging.info(f"Cost at step {iteration}: {cost_before}")
             # Log the current loss as a metric
             logging.info(f"Time to complete iteration {iteration + 1}: {t1 - t0} seconds")
+            if track_bitstrings:
+                # The distribution of the new params is evaluated right away, so that the one of the final params
+                # does not have to be evaluated again after the optimization
+                bitstring, probs = evaluate_params(params)
+                bitstring_list.append(bitstring)
             cost_pt.append(cost_before)
             params_list.append(params)
-            x.append(iteration)
 
             if min_cost is None or min_cost > cost_before:
                 min_cost = cost_before
                 min_param = params
-
-            if "store_dir" in kwargs:
-                plt.figure(figsize=(6, 4))
-                plt.plot(x, cost_pt, label='global minimum')
-                plt.xlabel("Optimization steps")
-                plt.ylabel("Cost / Energy")
-                plt.title('/'.join(['%s: %s' % (key, value) for (key, value) in config.items()]))
-                plt.legend()
-                plt.savefig(f"{kwargs['store_dir']}/plot_pennylane_qaoa_cost_{run_id}_{kwargs['repetition']}.pdf",
-                            dpi=300)
-                plt.clf()
+                if track_bitstrings:
+                    min_probs = probs
 
         params = min_param
+        probs = min_probs if track_bitstrings else evaluate_params(params)[1]
 
         logging.info(f"Final params: {params}")
         logging.info(f"Final costs: {min_cost}")
 
-        @qml.qnode(dev)
-        def samples(params):
-            circuit(params)
-            return [qml.sample(qml.PauliZ(i)) for i in range(wires)]
-
-        def evaluate_params_sampling(params):
-            s = samples([params[0], params[1]]).T
-            s = (1 - s) / 2
-            s = map(tuple, s)
-            counts = Counter(s)
-            indx = np.ndindex(*[2] * wires)
-            probs = {p: counts.get(p, 0) / config['shots'] for p in indx}
-            best_bitstring = max(probs, key=probs.get)
-
-            return best_bitstring, probs
-
-        @qml.qnode(dev)
-        def probability_circuit(params):
-            circuit(params)
-            return qml.probs(wires=range(wires))
-
-        def evaluate_params_probs(params):
-            probs_raw = np.array(probability_circuit([params[0], params[1]]))
-            indx = np.ndindex(*[2] * wires)
-            probs = {p: probs_raw[i] for i, p in enumerate(indx)}
-            best_bitstring = max(probs, key=probs.get)
-            return best_bitstring, probs
-
-        best_bitstring, probs = evaluate_params_probs(params) if config['shots'] is None else evaluate_params_sampling(
-            params)
-        additional_solver_information["quantum_timings"] = dev.timings
+        best_index = int(np.argmax(probs))
+        best_bitstring = _index_to_bitstring(best_index, wires)
+        additional_solver_information["quantum_timings"] = timings
         additional_solver_information["quantum_timings_sum"] = sum(additional_solver_information["quantum_timings"])
-        logging.info(f"{best_bitstring} with {probs[best_bitstring]}")
+        logging.info(f"{best_bitstring} with {probs[best_index]}")
 
-        logging.info(sorted(probs, key=probs.get, reverse=True)[:5])
+        # stable sort, so that bitstrings with the same probability keep their order
+        ranking = np.argsort(-probs, kind="stable")
+        logging.info([_index_to_bitstring(index, wires) for index in ranking[:5]])
 
-        # Save the bitstring with the highest probability per iteration to bitstring_list
-        bitstring_list = []
-        for el in params_list:
-            bitstring, _ = evaluate_params_probs(el) if config['shots'] is None else evaluate_params_sampling(el)
-            bitstring_list.append(bitstring)
+        # The cost history is plotted and the details are stored once after the optimization, which is not part of
+        # the time to solve
+        time_to_solve = round(time() * 1000 - start, 3)
 
         # Save the cost, best bitstring, variational parameters per iteration as well as the final prob. distribution
         # TODO: Maybe this can be done more efficient, e.g. only saving the circuit and its weights?
         json_data = {
             'cost': cost_pt,
-            'bitstrings': bitstring_list,
-            'params': [el.tolist() for el in params_list],  # convert list of tensors to list of lists
-            'probs': {str(key): value for key, value in probs.items()}  # convert key (tuples to strings)
+            'params': [el.tolist() for el in params_list]  # convert list of tensors to list of lists
         }
+        if track_bitstrings:
+            json_data['bitstrings'] = bitstring_list
+        probs_storage = config.get('probs_storage', "json")
+        if probs_storage == "json":
+            # convert key (tuples to strings)
+            json_data['probs'] = {str(_index_to_bitstring(index, wires)): float(value)
+                                  for index, value in enumerate(probs)}
+        elif probs_storage == "top_k":
+            json_data['probs'] = {str(_index_to_bitstring(index, wires)): float(probs[index])
+                                  for index in ranking[:config.get('top_k', 100)]}
+        elif probs_storage != "npz":
+            raise NotImplementedError(f"Storage of the probabilities {probs_storage} not implemented")
+
         if "store_dir" in kwargs:
+            self._plot_cost(cost_pt, config,
+                            f"{kwargs['store_dir']}/plot_pennylane_qaoa_cost_{run_id}_{kwargs['repetition']}.pdf")
             with open(f"{kwargs['store_dir']}/qaoa_details_{run_id}_{kwargs['repetition']}.json", 'w') as fp:
                 json.dump(json_data, fp)
+            if probs_storage == "npz":
+                # the probability of the basis state with index i, where wire 0 is the most significant bit
+                np.savez_compressed(f"{kwargs['store_dir']}/qaoa_probs_{run_id}_{kwargs['repetition']}.npz",
+                                    probs=probs)
         additional_solver_information["run_id"] = run_id
-        return best_bitstring, round(time() * 1000 - start, 3), additional_solver_information
+        return best_bitstring, time_to_solve, additional_solver_information
+
+
+def _index_to_bitstring(index: int, wires: int) -> tuple:
+    """
+    Converts the index of a basis state into its bitstring, where wire 0 is the most significant bit.
+
+    :param index: index of the basis state
+    :type index: int
+    :param wires: number of wires
+    :type wires: int
+    :return: bit of every wire
+    :rtype: tuple
+    """
+    return tuple(int(bit) for bit in np.binary_repr(int(index), width=wires))
 
 
 def monkey_init_array(self):
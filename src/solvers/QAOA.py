@@ -16,7 +16,6 @@ import numpy as np
 from braket.circuits import Circuit
 from scipy.optimize import minimize
 from typing import TypedDict, Union
-from time import sleep
 
 from devices.braket.Ionq import Ionq
 from devices.braket.LocalSimulator import LocalSimulator
@@ -135,7 +134,7 @@ class QAOA(Solver):
 
         # initialize reference solution (simple guess)
         bitstring_init = -1 * np.ones([n_qubits])
-        energy_init = np.dot(bitstring_init, np.dot(j, bitstring_init))
+        energy_init = ising_energies(bitstring_init[np.newaxis, :], j)[0]
 
         # set tracker to keep track of results
         tracker = {
@@ -166,7 +165,7 @@ class QAOA(Solver):
         result_energy, result_angle, tracker = train(
             device=device_wrapper.get_device(), options=options, p=depth, ising=j, n_qubits=n_qubits,
             n_shots=config['shots'],
-            opt_method=opt_method, tracker=tracker, s3_folder=device_wrapper.s3_destination_folder, verbose=True)
+            opt_method=opt_method, tracker=tracker, runner=device_wrapper.get_batch_runner(), verbose=True)
         time_to_solve = round(time() * 1000 - start, 3)
 
         # print execution time
@@ -276,8 +275,19 @@ def circuit(params, device, n_qubits, ising):
     return circ
 
 
+# function that computes the energies of measured spin configurations
+def ising_energies(spins, ising):
+    """
+    returns the energy s^T J s of every row s of spins; identical rows are evaluated only once and the energies are
+    computed row by row, so that no (n_shots, n_shots) matrix is created; ising may be a dense or a sparse matrix
+    """
+    unique_spins, inverse = np.unique(spins, axis=0, return_inverse=True)
+    energies = np.einsum('ij,ij->i', unique_spins, np.asarray(unique_spins @ ising))
+    return energies[inverse.reshape(-1)]
+
+
 # function that computes cost function for given params
-def objective_function(params, device, ising, n_qubits, n_shots, tracker, s3_folder, verbose):
+def objective_function(params, device, ising, n_qubits, n_shots, tracker, runner, verbose):
     """
     objective function takes a list of variational parameters as input,
     and returns the cost associated with those parameters
@@ -290,28 +300,8 @@ def objective_function(params, device, ising, n_qubits, n_shots, tracker, s3_fol
     # get a quantum circuit instance from the parameters
     qaoa_circuit = circuit(params, device, n_qubits, ising)
 
-    # classically simulate the circuit
-    # execute the correct device.run call depending on whether the backend is local or cloud based
-    if device.name == "DefaultSimulator" or device.name == "StateVectorSimulator":
-        task = device.run(qaoa_circuit, shots=n_shots)
-    else:
-        task = device.run(
-            qaoa_circuit, s3_folder, shots=n_shots, poll_timeout_seconds=3 * 24 * 60 * 60
-        )
-
-        # get ID and status of submitted task
-        task_id = task.id
-        status = task.state()
-        logging.info(f"ID of task: {task_id}")
-        logging.info(f"Status of task: {status}")
-        # wait for job to complete
-        while status != 'COMPLETED':
-            status = task.state()
-            logging.info(f"Status: {status}")
-            sleep(10)
-
-    # get result for this task
-    result = task.result()
+    # run the circuit on the device and wait for its result
+    result = runner.run([qaoa_circuit], n_shots)[0]
     logging.info(result)
 
     # convert results (0 and 1) to ising (-1 and 1)
@@ -319,7 +309,7 @@ def objective_function(params, device, ising, n_qubits, n_shots, tracker, s3_fol
     meas_ising[meas_ising == 0] = -1
 
     # get all energies (for every shot): (n_shots, 1) vector
-    all_energies = np.diag(np.dot(meas_ising, np.dot(ising, np.transpose(meas_ising))))
+    all_energies = ising_energies(meas_ising, ising)
 
     # find minimum and corresponding classical string
     energy_min = np.min(all_energies)
@@ -353,7 +343,7 @@ def objective_function(params, device, ising, n_qubits, n_shots, tracker, s3_fol
 
 
 # The function to execute the training: run classical minimization.
-def train(device, options, p, ising, n_qubits, n_shots, opt_method, tracker, s3_folder, verbose=True):
+def train(device, options, p, ising, n_qubits, n_shots, opt_method, tracker, runner, verbose=True):
     """
     function to run QAOA algorithm for given, fixed circuit depth p
     """
@@ -385,7 +375,7 @@ def train(device, options, p, ising, n_qubits, n_shots, opt_method, tracker, s3_
     result = minimize(
         objective_function,
         params0,
-        args=(device, ising, n_qubits, n_shots, tracker, s3_folder, verbose),
+        args=(device, ising, n_qubits, n_shots, tracker, runner, verbose),
         options=options,
         method=opt_method,
         bounds=bnds,
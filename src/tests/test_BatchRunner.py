@@ -0,0 +1,91 @@
+#  Copyright 2021 The QUARK Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Run from the src directory with: python -m pytest tests
+
+import pytest
+
+from devices.braket import Braket
+from devices.braket.Braket import BatchRunner, TaskBackend
+
+
+class StandInBackend(TaskBackend):
+    """
+    Stand-in for a device, where every task completes after a given number of polls of its state.
+    """
+
+    def __init__(self, polls_until_done: list, failing: set = frozenset()):
+        self.polls_until_done = polls_until_done
+        self.failing = failing
+        self.polls = {}
+        self.in_flight = set()
+        self.max_in_flight = 0
+        self.submitted = []
+        self.cancelled = []
+
+    def submit(self, circuit: any, shots: int) -> any:
+        self.submitted.append(circuit)
+        self.polls[circuit] = 0
+        self.in_flight.add(circuit)
+        self.max_in_flight = max(self.max_in_flight, len(self.in_flight))
+        return circuit
+
+    def state(self, task: any) -> str:
+        self.polls[task] += 1
+        if self.polls[task] < self.polls_until_done[task]:
+            return 'RUNNING'
+        return 'FAILED' if task in self.failing else 'COMPLETED'
+
+    def result(self, task: any) -> any:
+        self.in_flight.remove(task)
+        return f"result {task}"
+
+    def cancel(self, task: any) -> None:
+        self.in_flight.remove(task)
+        self.cancelled.append(task)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    intervals = []
+    monkeypatch.setattr(Braket, "sleep", intervals.append)
+    return intervals
+
+
+def test_results_in_order_with_bounded_concurrency(sleeps):
+    backend = StandInBackend([3, 1, 2, 5, 1, 4, 2, 1])
+    results = BatchRunner(backend, max_parallel=3).run(list(range(8)), shots=10)
+
+    assert results == [f"result {i}" for i in range(8)]
+    assert backend.max_in_flight == 3
+    assert not backend.in_flight
+
+
+def test_poll_interval_backs_off_and_resets(sleeps):
+    backend = StandInBackend([6, 8])
+    BatchRunner(backend, max_parallel=1, initial_poll_interval=0.5, max_poll_interval=4, backoff=2).run(
+        [0, 1], shots=10)
+
+    # the interval grows until the first task completes and starts from the beginning for the second task
+    assert sleeps == [0.5, 1, 2, 4, 4, 0.5, 1, 2, 4, 4, 4, 4]
+
+
+def test_failed_task_cancels_tasks_in_flight(sleeps):
+    backend = StandInBackend([2, 5, 5, 5, 5], failing={0})
+
+    with pytest.raises(RuntimeError, match="FAILED"):
+        BatchRunner(backend, max_parallel=3).run(list(range(5)), shots=10)
+
+    assert backend.submitted == [0, 1, 2]
+    assert sorted(backend.cancelled) == [1, 2]